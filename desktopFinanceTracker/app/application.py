@@ -1,14 +1,23 @@
 import customtkinter as ctk
-from app.screens.login import loginScreen
-from app.screens.register import registerScreen
-from app.screens.home import homeScreen
-from app.screens.transactions import transactionsScreen
-from app.screens.chartselection import chartsScreen
-from app.screens.deleteData import deleteDataScreen
-from app.screens.deleteAccount import deleteAccountScreen
-from app.screens.predictions import predictionScreen
-from CTkMessagebox import CTkMessagebox
-from database.db import getUserID, verifyLogin, clearEncryptionKey
+import importlib
+import threading
+import time
+from app import tracing
+from database.db import verifyLogin, connections, login_timings
+
+# Module and class of each screen. Screens are built the first time they are shown, so startup only pays for the
+# login screen, and the charting, ML and export libraries load with the screen that needs them.
+SCREENS = {
+    "login": ("app.screens.login", "loginScreen"),
+    "register": ("app.screens.register", "registerScreen"),
+    "home": ("app.screens.home", "homeScreen"),
+    "transactions": ("app.screens.transactions", "transactionsScreen"),
+    "charts": ("app.screens.chartselection", "chartsScreen"),
+    "deleteData": ("app.screens.deleteData", "deleteDataScreen"),
+    "deleteAccount": ("app.screens.deleteAccount", "deleteAccountScreen"),
+    "changePassword": ("app.screens.changePassword", "changePasswordScreen"),
+    "predictions": ("app.screens.predictions", "predictionScreen"),
+}
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("custom")
@@ -19,6 +28,7 @@ class Application(ctk.CTk):
         self.title("Finance Tracker")
         self.geometry("1600x980")
         self.currentUser = None
+        self.session = None
 
         self.mainFrame = ctk.CTkFrame(self, corner_radius=0)
         self.mainFrame.pack(fill="both", expand=True)
@@ -31,46 +41,45 @@ class Application(ctk.CTk):
         self.mainFrame.grid_columnconfigure(1, weight=1)
         self.mainFrame.grid_rowconfigure(0, weight=1)
 
-        self.frames = {
-            "login": loginScreen(self.contentFrame, self),
-            "register": registerScreen(self.contentFrame, self),
-            "home": homeScreen(self.contentFrame, self),
-            "transactions": transactionsScreen(self.contentFrame, self),
-            "charts": chartsScreen(self.contentFrame, self),
-            "deleteData": deleteDataScreen(self.contentFrame, self),
-            "deleteAccount": deleteAccountScreen(self.contentFrame, self),
-            "predictions": predictionScreen(self.contentFrame, self)
-        }
+        self.frames = {}
 
         self.sidebarButtons = {}
         self.hideSidebar()
         self.showFrame("login")
 
-    def showFrame(self, frameName):
-        if frameName == "login":
-            self.frames["login"] = loginScreen(self.contentFrame, self)
+    def buildFrame(self, frameName):
+        module, className = SCREENS[frameName]
+        with tracing.span("buildFrame", "screen", frame=frameName):
+            frame = getattr(importlib.import_module(module), className)(self.contentFrame, self)
+        self.frames[frameName] = frame
+        return frame
 
-        for frame in self.frames.values():
-            frame.grid_forget()
-        self.frames[frameName].grid(sticky="nsew", padx=10, pady=10)
-        self.contentFrame.grid_rowconfigure(0, weight=1)
-        self.contentFrame.grid_columnconfigure(0, weight=1)
-
-        if frameName == "login":
-            self.frames["login"].clearEntries()
-        elif frameName == "register":
-            self.frames["register"].clearEntries()
-
-        if frameName not in ["login", "register"]:
-            self.showSidebar()
-            if frameName == "home" and self.currentUser:
-                self.frames["home"].updateFeed()
-            elif frameName == "transactions" and self.currentUser:
-                self.frames["transactions"].updateTable()
-            elif frameName == "predictions" and self.currentUser:
-                self.frames["predictions"].buildUI()
-        else:
-            self.hideSidebar()
+    def showFrame(self, frameName):
+        with tracing.span("showFrame", "screen", frame=frameName):
+            if frameName == "login" or frameName not in self.frames:
+                self.buildFrame(frameName)
+
+            for frame in self.frames.values():
+                frame.grid_forget()
+            self.frames[frameName].grid(sticky="nsew", padx=10, pady=10)
+            self.contentFrame.grid_rowconfigure(0, weight=1)
+            self.contentFrame.grid_columnconfigure(0, weight=1)
+
+            if frameName == "login":
+                self.frames["login"].clearEntries()
+            elif frameName == "register":
+                self.frames["register"].clearEntries()
+
+            if frameName not in ["login", "register"]:
+                self.showSidebar()
+                if frameName == "home" and self.currentUser:
+                    self.frames["home"].updateFeed()
+                elif frameName == "transactions" and self.currentUser:
+                    self.frames["transactions"].updateTable()
+                elif frameName == "predictions" and self.currentUser:
+                    self.frames["predictions"].buildUI()
+            else:
+                self.hideSidebar()
 
     def showSidebar(self):
         if not self.sidebarButtons:
@@ -79,6 +88,7 @@ class Application(ctk.CTk):
             self.sidebarButtons["charts"] = ctk.CTkButton(self.buttonFrame, text="Charts", command=lambda: self.showFrame("charts"), corner_radius=0, height=60, fg_color="#303030", hover_color="#252525")
             self.sidebarButtons["predictions"] = ctk.CTkButton(self.buttonFrame, text="Predictions", command=lambda:self.showFrame("predictions"), corner_radius=0, height=60, fg_color="#303030", hover_color="#252525")
             self.sidebarButtons["deleteAccount"] = ctk.CTkButton(self.buttonFrame, text="Delete account", command=lambda: self.showFrame("deleteAccount"), corner_radius=0, height=40, fg_color="#303030", hover_color="#252525")
+            self.sidebarButtons["changePassword"] = ctk.CTkButton(self.buttonFrame, text="Change password", command=lambda: self.showFrame("changePassword"), corner_radius=0, height=40, fg_color="#303030", hover_color="#252525")
             self.sidebarButtons["deleteData"] = ctk.CTkButton(self.buttonFrame, text="Delete data", command=lambda: self.showFrame("deleteData"), corner_radius=0, height=40, fg_color="#303030", hover_color="#252525")
             self.sidebarButtons["logout"] = ctk.CTkButton(self.buttonFrame, text="Logout", command=self.logout, corner_radius=0, height=40, fg_color="#303030", hover_color="#252525")
 
@@ -88,7 +98,7 @@ class Application(ctk.CTk):
             spacer = ctk.CTkFrame(self.buttonFrame, fg_color="transparent", width=80)
             spacer.pack(side="top", fill="both", expand=True)
 
-            for key in ["logout", "deleteData", "deleteAccount"]:
+            for key in ["logout", "deleteData", "deleteAccount", "changePassword"]:
                 self.sidebarButtons[key].pack(side="bottom", fill="both", pady=(5, 0))
 
         self.buttonFrame.grid(row=0, column=0, sticky="ns")
@@ -96,34 +106,62 @@ class Application(ctk.CTk):
     def hideSidebar(self):
         self.buttonFrame.grid_forget()
 
-    def login(self, username, password):
-        if verifyLogin(username, password):
-            self.currentUser = username
+    def login(self, username, password, onComplete):
+        # Password checking and key derivation take about a second, so they run off the Tk thread.
+        # onComplete(success) is called back on the Tk thread once the login has finished.
+        def run():
+            start = time.perf_counter()
+            try:
+                session = verifyLogin(username, password)
+            except Exception as e:
+                print(f"Login error: {str(e)}")
+                session = None
+            finally:
+                connections.closeThreadConnection()
+            if tracing.tracer is not None:
+                # The stage timings of the login only go into the trace, as the arguments of its span.
+                tracing.tracer.record("login", "app", start, time.perf_counter() - start, **login_timings)
+            self.after(0, lambda: self.finishLogin(session, onComplete))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def finishLogin(self, session, onComplete):
+        if session is not None:
+            self.session = session
+            self.currentUser = session.username
+            session.events.subscribe(lambda event: self.after(0, self.onTransactionsChanged, session, event))
             self.showFrame("home")
-            self.frames["home"].updateFeed()
-            return True
-        return False
+        onComplete(session is not None)
+
+    def onTransactionsChanged(self, session, event):
+        # Runs on the Tk thread for every committed change, so the screens can patch what they show.
+        if session is not self.session:
+            return
+        # Screens not built yet load the current data when they are first shown.
+        for frameName in ["transactions", "home", "charts"]:
+            if frameName in self.frames:
+                self.frames[frameName].onTransactionsChanged(event)
+
+    def endSession(self):
+        if self.session is not None:
+            self.session.close()
+        self.session = None
+        self.currentUser = None
 
     def logout(self):
-        self.currentUser = None
-        clearEncryptionKey()
+        self.endSession()
         self.hideSidebar()
-        self.frames["login"].clearEntries()
-        self.frames["register"].clearEntries()
-        self.frames["transactions"].clearEntries()
-        self.frames["home"].clearEntries()
-        self.frames["charts"].clearEntries()
-        self.frames["deleteData"].clearEntries()
-        self.frames["deleteAccount"].clearEntries()
-        self.frames["predictions"].clearEntries()
+        for frame in self.frames.values():
+            frame.clearEntries()
         self.showFrame("login")
 
     def getUserID(self):
-        return getUserID(self.currentUser)
+        return self.session.userId if self.session else None
 
     def requireLogin(self, func):
         def wrapper(*args, **kwargs):
             if self.currentUser is None:
+                from CTkMessagebox import CTkMessagebox
                 CTkMessagebox(title="Error", message="Please log in!", icon="cancel")
                 self.showFrame("login")
                 return
@@ -134,8 +172,8 @@ class Application(ctk.CTk):
         if not self.currentUser:
             return None
 
-        user_id = self.getUserID()
-        if user_id is None:
+        session = self.session
+        if session is None:
             return None
 
         try:
@@ -147,22 +185,22 @@ class Application(ctk.CTk):
             from app.ml.ensemble import ensemble_model
 
             if model_type == 'linear':
-                model = linear_model(n_future_months=n_future_months, user_id=user_id)
+                model = linear_model(n_future_months=n_future_months, session=session)
                 return model.predict()
             elif model_type == 'polynomial':
-                model = polynomial_model(n_future_months=n_future_months, user_id=user_id)
+                model = polynomial_model(n_future_months=n_future_months, session=session)
                 return model.predict()
             elif model_type == 'sarimax':
-                model = sarimax_model(n_future_months=n_future_months, user_id=user_id)
+                model = sarimax_model(n_future_months=n_future_months, session=session)
                 return model.predict()
             elif model_type == 'randomforest':
-                model = randomforest_model(n_future_months=n_future_months, user_id=user_id)
+                model = randomforest_model(n_future_months=n_future_months, session=session)
                 return model.predict()
             elif model_type == 'xgboost':
-                model = xgboost_model(n_future_months=n_future_months, user_id=user_id)
+                model = xgboost_model(n_future_months=n_future_months, session=session)
                 return model.predict()
             elif model_type == 'ensemble':
-                model = ensemble_model(n_future_months=n_future_months, user_id=user_id)
+                model = ensemble_model(n_future_months=n_future_months, session=session)
                 return model.predict()
             else:
                 raise ValueError(f"Unknown model type: {model_type}")
@@ -14,5 +14,15 @@ EXPORTS_DIR = os.path.join(USER_DATA_DIR, 'exports')
 os.makedirs(EXPORTS_DIR, exist_ok=True)
 
 DB_PATH = Path(DB_DIR) / 'finance.db'
-DB_BACKUP_PATH = Path(DB_DIR) / 'backup_finance.db'
-EXPORTS_PATH = Path(EXPORTS_DIR)
\ No newline at end of file
+DB_BACKUP_DIR = Path(DB_DIR) / 'backups'
+BACKUP_KEEP = 5
+EXPORTS_PATH = Path(EXPORTS_DIR)
+
+# PBKDF2 iterations used when new accounts are created. Existing accounts keep the count they were created with.
+# Use database.db.calibrateKdfIterations() to find a value that suits the machine.
+KDF_ITERATIONS = int(os.environ.get('FINANCE_TRACKER_KDF_ITERATIONS', 100000))
+# Memory the charts screen may use to keep prepared chart data and rendered charts for reuse.
+CHART_CACHE_MB = int(os.environ.get('FINANCE_TRACKER_CHART_CACHE_MB', 64))
+
+# Where --trace / FINANCE_TRACKER_TRACE write their Chrome trace files when no path is given.
+TRACES_PATH = Path(USER_DATA_DIR) / 'traces'
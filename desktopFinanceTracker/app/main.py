@@ -1,12 +1,51 @@
-from database.db import initDB
+import time
+startedAt = time.perf_counter()
+
+from app.startup import ImportTimer, startupReport
+importTimer = ImportTimer()
+importTimer.install()
+
+import argparse, os, multiprocessing
+from app import tracing
+from database.db import initDB, connections
 from app.application import Application
 from app.config import DB_PATH
-import matplotlib, multiprocessing
-matplotlib.use('TkAgg')
+
+# matplotlib is only imported once a chart or prediction screen is opened; this picks its backend for then.
+os.environ.setdefault("MPLBACKEND", "TkAgg")
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Finance Tracker")
+    parser.add_argument("--trace", nargs="?", const="", default=os.environ.get(tracing.TRACE_ENV), metavar="PATH",
+                        help=f"record imports, screen changes, database calls and chart and ML stages as a Chrome trace (also {tracing.TRACE_ENV}=PATH or 1)")
+    args, _ = parser.parse_known_args()
+    return args
+
+def reportStartup():
+    shownAt = time.perf_counter()
+    if tracing.tracer is None:
+        importTimer.uninstall()
+    else:
+        tracing.tracer.record("startup", "app", startedAt, shownAt - startedAt)
+    print(startupReport(importTimer, startedAt, shownAt))
+
+def writeTrace():
+    importTimer.uninstall()
+    tracing.tracer.recordImports(importTimer)
+    print(f"Trace written to {tracing.tracer.write()}")
 
 if __name__ == "__main__":
     multiprocessing.freeze_support()
+    args = parseArgs()
+    if args.trace is not None:
+        tracing.start(None if args.trace in ("", "1") else args.trace, origin=startedAt)
     DB_PATH.parent.mkdir(exist_ok=True)
     initDB()
     app = Application()
-    app.mainloop()
\ No newline at end of file
+    app.after(0, reportStartup)
+    try:
+        app.mainloop()
+    finally:
+        connections.closeAll()
+        if tracing.tracer is not None:
+            writeTrace()
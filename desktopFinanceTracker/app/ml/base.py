@@ -1,5 +1,6 @@
 import datetime, math
-from database.db import viewAllTransactions
+from database.db import viewMonthlyRollups
+from app.tracing import traced
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import GridSearchCV, TimeSeriesSplit
@@ -7,27 +8,18 @@ from sklearn.feature_selection import VarianceThreshold
 from joblib import parallel_backend
 
 class Base:
-    def __init__(self, user_id, n_future_months=1, skip_fetch=False):
-        self.user_id = user_id
+    def __init__(self, session, n_future_months=1, skip_fetch=False):
+        self.session = session
         self.n_future_months = n_future_months
         self.variance_selector = None
         if not skip_fetch:
             self.monthly_expenses, self.category_pivot, self.all_categories = self.fetch_data()
             self.months, self.x, self.y, self.exog = self.get_months_x_y()
 
+    @traced("ml")
     def fetch_data(self):
-        rows = viewAllTransactions(self.user_id)
-        data = []
-
-        for row in rows:
-            date = row[1]
-            amount = row[4]
-            type_ = row[5]
-            category = row[2]
-            if type_ == "expense":
-                date_obj = datetime.datetime.strptime(date, "%d-%m-%Y")
-                month_key = date_obj.strftime("%Y-%m")
-                data.append({"YearMonth": month_key, "Category": category, "Amount": abs(amount)})
+        rollups = viewMonthlyRollups(self.session, "expense")
+        data = [{"YearMonth": rollup.month, "Category": rollup.category, "Amount": rollup.absTotal} for rollup in rollups]
 
         df = pd.DataFrame(data)
         monthly_expenses = df.groupby("YearMonth")["Amount"].sum().to_dict()
@@ -41,6 +33,7 @@ class Base:
 
         return monthly_expenses, category_pivot, all_categories
 
+    @traced("ml")
     def get_months_x_y(self):
         months = sorted(self.monthly_expenses.keys())
         y = np.array([self.monthly_expenses[month] for month in months])
@@ -110,6 +103,7 @@ class Base:
         print(f"Features after VarianceThreshold: {self.variance_selector.get_support().sum()}")
         return self.variance_selector
 
+    @traced("ml")
     def run_gridsearch(self, pipeline, param_grid):
         n_splits = max(1, min(3, (len(self.y) - 1) // 2))
         cv = TimeSeriesSplit(n_splits=n_splits)
@@ -1,4 +1,5 @@
 from app.ml.base import Base
+from app.tracing import traced
 from app.ml.linear import linear_model
 from app.ml.polynomial import polynomial_model
 from app.ml.sarimax import sarimax_model
@@ -6,21 +7,22 @@ from app.ml.xgboost import xgboost_model
 import numpy as np
 
 class ensemble_model(Base):
-    def __init__(self, user_id, n_future_months=1):
-        super().__init__(user_id, n_future_months)
+    def __init__(self, session, n_future_months=1):
+        super().__init__(session, n_future_months)
 
-        if user_id is None:
-            raise ValueError("user_id must be provided")
+        if session is None:
+            raise ValueError("session must be provided")
 
     def prepare_models(self):
         pre_data = (self.monthly_expenses, self.category_pivot, self.all_categories)
-        model_linear = linear_model(n_future_months=self.n_future_months, user_id=self.user_id, pre_fetched_data=pre_data)
-        model_poly = polynomial_model(n_future_months=self.n_future_months, user_id=self.user_id, pre_fetched_data=pre_data)
-        model_sarimax = sarimax_model(n_future_months=self.n_future_months, user_id=self.user_id, pre_fetched_data=pre_data)
-        model_xgboost = xgboost_model(n_future_months=self.n_future_months, user_id=self.user_id, pre_fetched_data=pre_data)
+        model_linear = linear_model(n_future_months=self.n_future_months, session=self.session, pre_fetched_data=pre_data)
+        model_poly = polynomial_model(n_future_months=self.n_future_months, session=self.session, pre_fetched_data=pre_data)
+        model_sarimax = sarimax_model(n_future_months=self.n_future_months, session=self.session, pre_fetched_data=pre_data)
+        model_xgboost = xgboost_model(n_future_months=self.n_future_months, session=self.session, pre_fetched_data=pre_data)
 
         return model_linear, model_poly, model_sarimax, model_xgboost
 
+    @traced("ml")
     def predict(self):
         model_linear, model_poly, model_sarimax, model_xgboost = self.prepare_models()
 
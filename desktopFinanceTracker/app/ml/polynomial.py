@@ -1,4 +1,5 @@
 from app.ml.base import Base
+from app.tracing import traced
 import numpy as np
 from sklearn.linear_model import LinearRegression, Ridge, Lasso
 from sklearn.preprocessing import PolynomialFeatures, StandardScaler, RobustScaler, MinMaxScaler, MaxAbsScaler, QuantileTransformer
@@ -9,15 +10,15 @@ from optuna.samplers import TPESampler
 from optuna.pruners import MedianPruner
 
 class polynomial_model(Base):
-    def __init__(self, user_id, n_future_months=1, pre_fetched_data=None):
+    def __init__(self, session, n_future_months=1, pre_fetched_data=None):
         skip_fetch = pre_fetched_data is not None
-        super().__init__(user_id, n_future_months, skip_fetch=skip_fetch)
+        super().__init__(session, n_future_months, skip_fetch=skip_fetch)
         if pre_fetched_data:
             self.monthly_expenses, self.category_pivot, self.all_categories = pre_fetched_data
             self.months, self.x, self.y, self.exog = self.get_months_x_y()
 
-        if user_id is None:
-            raise ValueError("user_id must be provided")
+        if session is None:
+            raise ValueError("session must be provided")
 
         self.scalers = {
             'standard': StandardScaler(),
@@ -72,6 +73,7 @@ class polynomial_model(Base):
         predictions = pipeline.predict(x_val)
         return mean_squared_error(y_val, predictions)
 
+    @traced("ml")
     def predict(self):
         if len(self.y) < 4:
             raise ValueError("Insufficient data: Need at least 4 months of expenses for training.")
@@ -1,14 +1,15 @@
 from app.ml.base import Base
+from app.tracing import traced
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.pipeline import Pipeline
 import numpy as np
 
 class randomforest_model(Base):
-    def __init__(self, user_id, n_future_months=1):
-        super().__init__(user_id, n_future_months)
+    def __init__(self, session, n_future_months=1):
+        super().__init__(session, n_future_months)
 
-        if user_id is None:
-            raise ValueError("user_id must be provided")
+        if session is None:
+            raise ValueError("session must be provided")
 
     def pipeline_paramgrid(self):
         pipeline = Pipeline([
@@ -28,6 +29,7 @@ class randomforest_model(Base):
 
         return pipeline, param_grid
 
+    @traced("ml")
     def predict(self):
         if len(self.y) < 4:
             raise ValueError("Insufficient data: Need at least 4 months of expenses for training.")
@@ -0,0 +1,93 @@
+import customtkinter as ctk
+import threading
+from database.db import connections
+from database.rekey import changePassword
+
+class changePasswordScreen(ctk.CTkFrame):
+    def __init__(self, parent, app):
+        super().__init__(parent, corner_radius=0, fg_color="#101010")
+        self.app = app
+        self.changing = False
+
+        self.buildUI()
+
+    def buildUI(self):
+        ctk.CTkLabel(self, text="Change Password", font=ctk.CTkFont(size=24, weight="bold")).pack(pady=(10, 20))
+
+        self.changePasswordFrame = ctk.CTkFrame(self, corner_radius=0, fg_color="transparent")
+        self.changePasswordFrame.pack(fill="both", expand=True)
+
+        ctk.CTkLabel(self.changePasswordFrame, text="All of your transactions are re-encrypted with the new password. This can take a while for large histories; if it is interrupted, run it again with the same new password to continue.", wraplength=500).pack(pady=(20, 10))
+        ctk.CTkLabel(self.changePasswordFrame, text="Current password").pack(pady=(10, 0))
+        self.oldPasswordEntry = ctk.CTkEntry(self.changePasswordFrame, show="*")
+        self.oldPasswordEntry.pack()
+        ctk.CTkLabel(self.changePasswordFrame, text="New password").pack(pady=(10, 0))
+        self.newPasswordEntry = ctk.CTkEntry(self.changePasswordFrame, show="*")
+        self.newPasswordEntry.pack()
+        ctk.CTkLabel(self.changePasswordFrame, text="Confirm new password").pack(pady=(10, 0))
+        self.confirmPasswordEntry = ctk.CTkEntry(self.changePasswordFrame, show="*")
+        self.confirmPasswordEntry.pack()
+
+        self.changeButton = ctk.CTkButton(self.changePasswordFrame, text="Change Password", command=self.change_password, corner_radius=0)
+        self.changeButton.pack(pady=(40, 5))
+        self.progressBar = ctk.CTkProgressBar(self.changePasswordFrame, mode="determinate")
+        self.progressBar.set(0)
+        self.progressLabel = ctk.CTkLabel(self.changePasswordFrame, text="")
+
+    def showMessage(self, text, color):
+        message = ctk.CTkLabel(self.changePasswordFrame, text=text, text_color=color)
+        message.pack(pady=10)
+        message.after(5000, message.destroy)
+
+    def change_password(self):
+        if self.changing:
+            return
+
+        old_password = self.oldPasswordEntry.get()
+        new_password = self.newPasswordEntry.get()
+        if not old_password or not new_password:
+            self.showMessage("Enter your current and new password!", "red")
+            return
+        if new_password != self.confirmPasswordEntry.get():
+            self.showMessage("The new passwords do not match!", "red")
+            return
+
+        self.changing = True
+        self.changeButton.configure(state="disabled", text="Re-encrypting...")
+        self.progressBar.set(0)
+        self.progressBar.pack(pady=5)
+        self.progressLabel.pack()
+
+        session = self.app.session
+        thread = threading.Thread(target=self._change_in_background, args=(session, old_password, new_password), daemon=True)
+        thread.start()
+
+    def _change_in_background(self, session, old_password, new_password):
+        try:
+            result = changePassword(session, old_password, new_password, progress=lambda done, total, rate: self.after(0, self._on_progress, done, total, rate))
+            self.after(0, self._on_complete, result, None)
+        except Exception as e:
+            self.after(0, self._on_complete, None, e)
+        finally:
+            connections.closeThreadConnection()
+
+    def _on_progress(self, done, total, rate):
+        self.progressBar.set(done / total if total else 1)
+        self.progressLabel.configure(text=f"{done} / {total} transactions ({rate:,.0f} rows/s)")
+
+    def _on_complete(self, result, error):
+        self.changing = False
+        self.changeButton.configure(state="normal", text="Change Password")
+        self.progressBar.pack_forget()
+        self.progressLabel.pack_forget()
+        if error is not None:
+            self.showMessage(str(error), "red")
+            return
+
+        self.clearEntries()
+        self.showMessage(f"Password changed! {result.rows} transactions re-encrypted in {result.seconds:.1f}s ({result.rowsPerSecond:,.0f} rows/s).", "green")
+
+    def clearEntries(self):
+        self.oldPasswordEntry.delete(0, "end")
+        self.newPasswordEntry.delete(0, "end")
+        self.confirmPasswordEntry.delete(0, "end")
@@ -1,22 +1,8 @@
 from .baseChart import Chart
-import customtkinter as ctk
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
 
 class barChart(Chart):
-    def draw(self, chartFrame, dbTable, labels, values):
-        if not labels:
-            label = ctk.CTkLabel(chartFrame, text="No data to display.")
-            label.pack()
-            return
-
-        chartFrameLeft = ctk.CTkFrame(chartFrame)
-        chartFrameLeft.grid(row=0, column=0, sticky="nsew")
-
-        plt.style.use('dark_background')
-        fig = Figure(figsize=(10, 9), dpi=100, facecolor="#101010")
-        ax = fig.add_subplot(111)
+    def render(self, ax, data):
+        labels, values = data.byLabel.labels, data.byLabel.net
 
         ax.bar(labels, values, color="orange")
         ax.grid(True, alpha=0.3)
@@ -28,8 +14,4 @@ class barChart(Chart):
         for i, v in enumerate(values):
             ax.text(i, v + max(values) * 0.01, f'€{v:,.0f}', ha='center', va='bottom')
 
-        fig.tight_layout()
-
-        canvas = FigureCanvasTkAgg(fig, master=chartFrameLeft)
-        canvas.draw()
-        canvas.get_tk_widget().pack(expand=True, fill="both")
\ No newline at end of file
+        ax.figure.tight_layout()
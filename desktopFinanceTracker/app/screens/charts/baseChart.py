@@ -1,3 +1,6 @@
 class Chart:
-    def draw(self, chartFrame, dbTable, labels, values):
-        pass
\ No newline at end of file
+    # Charts draw onto an Axes that the charts screen reuses between draws (see renderer.py). render runs on a
+    # worker thread and may return a callable to run on the Tk thread once the chart is shown, e.g. to attach
+    # hover cursors. A chart with nothing to show raises ValueError with the message to display instead.
+    def render(self, ax, data):
+        pass
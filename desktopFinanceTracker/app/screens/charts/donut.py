@@ -1,24 +1,9 @@
 from .baseChart import Chart
-import customtkinter as ctk
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 
 class donutChart(Chart):
-    def draw(self, chartFrame, dbTable, labels, values):
-        if not labels:
-            label = ctk.CTkLabel(chartFrame, text="No data to display.")
-            label.pack()
-            return
-
-        chartFrameLeft = ctk.CTkFrame(chartFrame)
-        chartFrameLeft.grid(row=0, column=0, sticky="nsew")
-
-        plt.style.use('dark_background')
-        fig = Figure(figsize=(8, 6), dpi=100, facecolor="#101010")
-        ax = fig.add_subplot(111)
-
+    def render(self, ax, data):
+        labels, values = data.byLabel.labels, data.byLabel.net
         wedges, texts = ax.pie(values, wedgeprops=dict(width=0.5), startangle=-40)
 
         bbox_props = dict(boxstyle="square,pad=0.3", fc="w", ec="k", lw=0.72)
@@ -48,7 +33,3 @@ class donutChart(Chart):
                 horizontalalignment=horizontalalignment,
                 **kw
             )
-
-        canvas = FigureCanvasTkAgg(fig, master=chartFrameLeft)
-        canvas.draw()
-        canvas.get_tk_widget().pack(expand=True, fill="both")
\ No newline at end of file
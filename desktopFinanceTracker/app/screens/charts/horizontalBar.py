@@ -1,41 +1,9 @@
 from .baseChart import Chart
-import customtkinter as ctk
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 
 class top5ExpensesChart(Chart):
-    def draw(self, chartFrame, dbTable, labels, values):
-        if not labels:
-            label = ctk.CTkLabel(chartFrame, text="No data to display.")
-            label.pack()
-            return
-
-        chartFrameLeft = ctk.CTkFrame(chartFrame)
-        chartFrameLeft.grid(row=0, column=0, sticky="nsew")
-
-        plt.style.use('dark_background')
-        fig = Figure(figsize=(10, 9), dpi=100, facecolor="#101010")
-        ax = fig.add_subplot(111)
-
-        topExpenses = {}
-        for row in dbTable:
-            category = row[2]
-            description = row[3]
-            amount = row[4]
-            transactionType = row[5]
-
-            if transactionType == 'expense':
-                key = f"{category}: {description}"
-                if key not in topExpenses:
-                    topExpenses[key] = 0
-                topExpenses[key] += amount
-
-        sortedExpenses = sorted(topExpenses.items(), key=lambda x: x[1], reverse=True)[:5]
-
-        descriptions = [item[0] for item in sortedExpenses]
-        expenseValues = [abs(item[1]) for item in sortedExpenses]
+    def render(self, ax, data):
+        descriptions, expenseValues = data.topExpenses(5)
 
         y = np.arange(len(descriptions))
         width=0.4
@@ -51,8 +19,4 @@ class top5ExpensesChart(Chart):
         for i, (bar, value) in enumerate(zip(bars, expenseValues)):
             ax.text(bar.get_width() + max(expenseValues) * 0.01, bar.get_y() + bar.get_height()/2, f'€{value:,.0f}', va='center', fontsize=8)
 
-        fig.tight_layout()
-
-        canvas = FigureCanvasTkAgg(fig, master=chartFrameLeft)
-        canvas.draw()
-        canvas.get_tk_widget().pack(expand=True, fill="both")
\ No newline at end of file
+        ax.figure.tight_layout()
@@ -0,0 +1,115 @@
+import threading
+import matplotlib.pyplot as plt
+from matplotlib import rcParams
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from database.db import connections
+from app import tracing
+
+plt.style.use('dark_background')
+
+SUBPLOT_PARAMS = ("left", "right", "bottom", "top", "wspace", "hspace")
+
+class ChartCanvas(FigureCanvasTkAgg):
+    # Agg rendering happens on a worker thread while renderLock is held. A redraw Tk asks for in the meantime
+    # (e.g. a resize) is skipped and done once the render has been shown.
+    def __init__(self, figure, master):
+        self.renderLock = threading.Lock()
+        self.redrawSkipped = False
+        super().__init__(figure, master=master)
+
+    def draw(self):
+        if not self.renderLock.acquire(blocking=False):
+            self.redrawSkipped = True
+            return
+        try:
+            super().draw()
+        finally:
+            self.renderLock.release()
+
+class ChartRenderer:
+    # The one Figure, Axes and canvas the charts screen draws into. Each render clears the artists off the same
+    # Axes, so switching charts never rebuilds the figure or the Tk widget. Loading and aggregating the data and
+    # the Agg rendering run on a worker thread; only the blit runs on the Tk thread. Starting a render supersedes
+    # any render still running, whose result is then dropped.
+    def __init__(self, master, cache=None):
+        self.master = master
+        self.cache = cache
+        self.figure = Figure(dpi=100, facecolor="#101010")
+        self.ax = self.figure.add_subplot(111)
+        self.canvas = ChartCanvas(self.figure, master)
+        self.subplotDefaults = {name: rcParams[f"figure.subplot.{name}"] for name in SUBPLOT_PARAMS}
+        self.generation = 0
+        self.cursor = None
+
+    def widget(self):
+        return self.canvas.get_tk_widget()
+
+    def start(self, dataKey, chartKey, prepare, chart, onComplete):
+        # prepare() runs on the worker and returns the chart data. onComplete(data, error) runs on the Tk thread,
+        # with error set if there was nothing to draw or drawing failed.
+        # With a cache, the data is stored under dataKey, a (userId, ..., version) tuple, and the rendered image under
+        # dataKey extended with the chart key and canvas size. A cached image replaces the Agg rasterisation, but the
+        # chart's artists are still rebuilt so Tk redraws and hover cursors keep working.
+        self.cancel()
+        generation = self.generation
+
+        def run():
+            data = error = attach = None
+            try:
+                data = self.cache.get(dataKey) if self.cache is not None else None
+                if data is None:
+                    with tracing.span("prepareChartData", "chart", chart=chartKey):
+                        data = prepare()
+                    if self.cache is not None:
+                        self.cache.put(dataKey, data, data.nbytes)
+                if data.empty:
+                    raise ValueError("No data to display.")
+                with self.canvas.renderLock:
+                    if generation != self.generation:
+                        return
+                    width, height = (int(value) for value in self.figure.bbox.size)
+                    imageKey = (*dataKey[:-1], chartKey, width, height, dataKey[-1])
+                    image = self.cache.get(imageKey) if self.cache is not None else None
+                    # Charts that used tight_layout leave the subplot parameters changed for the next one.
+                    self.figure.subplots_adjust(**self.subplotDefaults)
+                    self.ax.clear()
+                    with tracing.span("render", "chart", chart=chartKey):
+                        attach = chart.render(self.ax, data)
+                    if self.cache is not None:
+                        # Charts keep the groupings they compute on the data, so its size is recorded again once drawn.
+                        self.cache.put(dataKey, data, data.nbytes)
+                    if image is not None:
+                        self.canvas.get_renderer().restore_region(image)
+                    else:
+                        with tracing.span("rasterize", "chart", chart=chartKey):
+                            FigureCanvasAgg.draw(self.canvas)
+                        if self.cache is not None:
+                            self.cache.put(imageKey, self.canvas.copy_from_bbox(self.figure.bbox), width * height * 4)
+            except Exception as e:
+                error = e
+            finally:
+                connections.closeThreadConnection()
+            self.master.after(0, lambda: self.finish(generation, data, error, attach, onComplete))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def finish(self, generation, data, error, attach, onComplete):
+        if generation != self.generation:
+            return
+        if error is None:
+            with tracing.span("blit", "chart"):
+                self.canvas.blit()
+            if self.canvas.redrawSkipped:
+                self.canvas.redrawSkipped = False
+                self.canvas.draw()
+            if attach is not None:
+                self.cursor = attach()
+        onComplete(data, error)
+
+    def cancel(self):
+        self.generation += 1
+        if self.cursor is not None:
+            self.cursor.remove()
+            self.cursor = None
@@ -1,5 +1,6 @@
 import customtkinter as ctk
 from app.utils.chartpreparation import prepareChartData
+from app.utils.chartcache import ChartCache
 from app.screens.charts.pie import pieChart
 from app.screens.charts.bar import barChart
 from app.screens.charts.donut import donutChart
@@ -8,6 +9,7 @@ from app.screens.charts.surplusDeficit import surplusDeficitChart
 from app.screens.charts.savings import savingsChart
 from app.screens.charts.barByDate import barByDateChart
 from app.screens.charts.monthlyCategorySplit import monthlyCategorySplitChart
+from app.screens.charts.renderer import ChartRenderer
 
 class chartsScreen(ctk.CTkFrame):
     def __init__(self, parent, app):
@@ -18,6 +20,7 @@ class chartsScreen(ctk.CTkFrame):
         self.yearVar = ctk.StringVar(value="")
         self.chartFrame = None
         self.legendFrame = None
+        self.chartCache = ChartCache()
 
         self.chartTypes = {
             "pie": (pieChart(), "Pie Chart", "A pie chart of all transactions."),
@@ -79,41 +82,75 @@ class chartsScreen(ctk.CTkFrame):
         self.chartFrame.grid_columnconfigure(1, weight=0)
         self.chartFrame.grid_rowconfigure(0, weight=1)
 
+        self.chartArea = ctk.CTkFrame(self.chartFrame, fg_color="#101010", corner_radius=0)
+        self.chartArea.grid(row=0, column=0, sticky="nsew")
+        self.messageLabel = ctk.CTkLabel(self.chartArea, text="")
+        self.spinner = ctk.CTkProgressBar(self.chartArea, mode="indeterminate", width=160)
+        self.renderer = None
+
         self.legendFrame = ctk.CTkFrame(self.chartFrame, fg_color="#101010", corner_radius=0)
         self.legendFrame.grid(row=0, column=1, sticky="nsew")
 
     def drawChart(self):
         if not self.app.currentUser:
             return
-        
-        for widget in self.chartFrame.winfo_children():
-            widget.destroy()
 
-        self.legendFrame = ctk.CTkFrame(self.chartFrame, fg_color="#101010", corner_radius=0)
-        self.legendFrame.grid(row=0, column=1, sticky="nsew")
+        if self.renderer is None:
+            self.renderer = ChartRenderer(self.chartArea, self.chartCache)
+
+        self.clearLegend()
+        self.messageLabel.pack_forget()
+
+        chartType = self.chartTypeVar.get()
+        typeFilter = self.typeFilterVar.get()
+        if chartType == "horizontalbar" and typeFilter == "income":
+            self.renderer.cancel()
+            self.hideSpinner()
+            self.showMessage("No expense data available for 'income' filter.")
+            return
+
+        session = self.app.session
+        year = self.yearEntry.get().strip() or None
+        chartObject = self.chartTypes[chartType][0]
+
+        self.spinner.place(relx=0.5, rely=0.5, anchor="center")
+        self.spinner.lift()
+        self.spinner.start()
+        dataKey = (session.userId, year, typeFilter, session.events.version)
+        self.renderer.start(dataKey, chartType, lambda: prepareChartData(session, year, typeFilter), chartObject, lambda data, error: self.showChart(data, error, typeFilter))
+
+    def showChart(self, data, error, typeFilter):
+        self.hideSpinner()
+        if error is not None:
+            self.showMessage(str(error))
+            return
+
+        self.messageLabel.pack_forget()
+        self.renderer.widget().pack(fill="both", expand=True)
+        self.showLegend(data, typeFilter)
+
+    def hideSpinner(self):
+        self.spinner.stop()
+        self.spinner.place_forget()
+
+    def showMessage(self, text):
+        if self.renderer is not None:
+            self.renderer.widget().pack_forget()
+        self.messageLabel.configure(text=text)
+        self.messageLabel.pack()
 
+    def clearLegend(self):
+        for widget in self.legendFrame.winfo_children():
+            widget.destroy()
+
+    def showLegend(self, data, typeFilter):
         legendTitle = ctk.CTkLabel(self.legendFrame, text="Category Breakdown", font=ctk.CTkFont(size=16, weight="bold"))
         legendTitle.pack(pady=(0, 5))
 
         legendScroll = ctk.CTkScrollableFrame(self.legendFrame, fg_color="#181818")
         legendScroll.pack(fill="both", expand=True, padx=5)
-        user_id = self.app.getUserID()
-        year = self.yearEntry.get().strip() or None
-        dbTable, labels, netValues, incomeValues, expenseValues = prepareChartData(user_id, year, self.typeFilterVar.get())
-
-        if not labels:
-            label = ctk.CTkLabel(self.chartFrame, text="No data to display.")
-            label.pack()
-            return
-        
-        chartType = self.chartTypeVar.get()
-        if chartType == "horizontalbar" and self.typeFilterVar.get() == "income":
-            label = ctk.CTkLabel(self.chartFrame, text="No expense data available for 'income' filter.")
-            label.pack()
-            return
-        chartObject = self.chartTypes[chartType][0]
-        chartObject.draw(self.chartFrame, dbTable, labels, netValues)
 
+        labels, netValues, incomeValues, expenseValues = data.byLabel
         totalAmount = sum(abs(v) for v in netValues)
         for i, (label, netValue, incomeValue, expenseValue) in enumerate(zip(labels, netValues, incomeValues, expenseValues)):
             categoryFrame = ctk.CTkFrame(legendScroll, fg_color="#303030")
@@ -122,7 +159,7 @@ class chartsScreen(ctk.CTkFrame):
             categoryLabel = ctk.CTkLabel(categoryFrame, text=label, font=ctk.CTkFont(size=12, weight="bold"))
             categoryLabel.pack(anchor="w", padx=5, pady=(5, 0))
 
-            if self.typeFilterVar.get() == "all":
+            if typeFilter == "all":
                 if incomeValue > 0:
                     incomePercentage = (incomeValue / totalAmount * 100) if totalAmount > 0 else 0
                     incomeText = f"Income: €{incomeValue:,.2f} ({incomePercentage:.1f}%)"
@@ -132,12 +169,22 @@ class chartsScreen(ctk.CTkFrame):
                     expenseText = f"Expense: -€{expenseValue:,.2f} ({expensePercentage:.1f}%)"
                     ctk.CTkLabel(categoryFrame, text=expenseText, font=ctk.CTkFont(size=12, weight="bold"), text_color="red").pack(anchor="w", padx=5, pady=(0, 2))
             else:
-                value = incomeValue if self.typeFilterVar.get() == "income" else expenseValue
+                value = incomeValue if typeFilter == "income" else expenseValue
                 percentage = (value / totalAmount *100) if totalAmount > 0 else 0
-                prefix = "" if self.typeFilterVar.get() == "income" else "-"
+                prefix = "" if typeFilter == "income" else "-"
                 amountText = f"{prefix}€{value:,.2f} ({percentage:.1f}%)"
-                color = "green" if self.typeFilterVar.get() == "income" else "red"
+                color = "green" if typeFilter == "income" else "red"
                 ctk.CTkLabel(categoryFrame, text=amountText, font=ctk.CTkFont(size=12, weight="bold"), text_color=color).pack(anchor="w", padx=5, pady=(0, 2))
 
+    def onTransactionsChanged(self, event):
+        self.chartCache.dropStale(self.app.session.userId, event.version)
+
     def clearEntries(self):
-        self.yearEntry.delete(0, "end")
\ No newline at end of file
+        self.yearEntry.delete(0, "end")
+        self.chartCache.clear()
+        self.clearLegend()
+        self.messageLabel.pack_forget()
+        self.hideSpinner()
+        if self.renderer is not None:
+            self.renderer.cancel()
+            self.renderer.widget().pack_forget()
@@ -1,5 +1,5 @@
 import customtkinter as ctk
-from database.db import deleteUser, clearEncryptionKey
+from database.db import deleteUser
 
 class deleteAccountScreen(ctk.CTkFrame):
     def __init__(self, parent, app):
@@ -32,24 +32,22 @@ class deleteAccountScreen(ctk.CTkFrame):
 
     def confirm_user_deletion(self):
         password = self.passwordEntry.get()
-        currentUser = self.app.currentUser
         if not password:
             error = ctk.CTkLabel(self.deleteAccountFrame, text="Please enter your password to delete your account!", text_color="red")
             error.pack()
             error.after(5000, error.destroy)
             return
 
-        success, message = deleteUser(currentUser, password)
+        success, message = deleteUser(self.app.session, password)
 
         if success:
+            self.app.endSession()
             self.app.showFrame("login")
             loginFrame = self.app.frames["login"]
             try:
                 targetFrame = loginFrame.centerFrame
             except AttributeError:
                 targetFrame = loginFrame
-            currentUser = None
-            clearEncryptionKey()
             success = ctk.CTkLabel(targetFrame, text=message, text_color="green")
             success.pack(pady=20)
             success.after(5000, success.destroy)
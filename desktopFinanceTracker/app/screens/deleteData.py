@@ -1,5 +1,5 @@
 import customtkinter as ctk
-from database.db import clearAllTransactions
+from database.db import clearAllTransactions, startCompaction
 
 
 class deleteDataScreen(ctk.CTkFrame):
@@ -25,12 +25,19 @@ class deleteDataScreen(ctk.CTkFrame):
 
         ctk.CTkButton(self.dataDeleteFrame, text="Delete", command=self.delete_data, fg_color="#D10000", hover_color="#9B0000", corner_radius=0).pack(pady=40)
 
+        ctk.CTkLabel(self.dataDeleteFrame, text="Maintenance", font=ctk.CTkFont(size=18, weight="bold")).pack(pady=(20, 0))
+        ctk.CTkLabel(self.dataDeleteFrame, text="Space freed by deleted data is returned to disk in the background. Compact now to reclaim it immediately.", font=ctk.CTkFont(size=12)).pack()
+        self.compactButton = ctk.CTkButton(self.dataDeleteFrame, text="Compact now", command=self.compact_database, corner_radius=0)
+        self.compactButton.pack(pady=(10, 5))
+        self.compactProgress = ctk.CTkProgressBar(self.dataDeleteFrame, mode="determinate")
+        self.compactProgress.set(0)
+
     def delete_data(self):
-        user_id = self.app.getUserID()
+        session = self.app.session
         data_deletion = self.deleteDataEntry.get()
 
         if data_deletion == str("DELETE ALL DATA"):
-            clearAllTransactions(user_id)
+            clearAllTransactions(session)
             success = ctk.CTkLabel(self.dataDeleteFrame, text="All data successfully deleted!", text_color="green", font=ctk.CTkFont(size=16, weight="bold"))
             success.pack()
             success.after(5000, success.destroy)
@@ -39,5 +46,27 @@ class deleteDataScreen(ctk.CTkFrame):
             error.pack()
             error.after(5000, error.destroy)
 
+    def compact_database(self):
+        self.compactButton.configure(state="disabled", text="Compacting...")
+        self.compactProgress.set(0)
+        self.compactProgress.pack(pady=5)
+        startCompaction(
+            progress=lambda freed, total: self.after(0, self._on_compact_progress, freed, total),
+            onComplete=lambda freed, error: self.after(0, self._on_compact_complete, freed, error)
+        )
+
+    def _on_compact_progress(self, freed, total):
+        self.compactProgress.set(freed / total if total else 1)
+
+    def _on_compact_complete(self, freed, error):
+        self.compactButton.configure(state="normal", text="Compact now")
+        self.compactProgress.pack_forget()
+        if error is not None:
+            message = ctk.CTkLabel(self.dataDeleteFrame, text=f"Compaction failed: {error}", text_color="red", font=ctk.CTkFont(size=16, weight="bold"))
+        else:
+            message = ctk.CTkLabel(self.dataDeleteFrame, text=f"Database compacted, {freed} pages freed.", text_color="green", font=ctk.CTkFont(size=16, weight="bold"))
+        message.pack()
+        message.after(5000, message.destroy)
+
     def clearEntries(self):
         self.deleteDataEntry.delete(0, "end")
\ No newline at end of file
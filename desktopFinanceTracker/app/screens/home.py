@@ -1,13 +1,14 @@
 import customtkinter as ctk
 import datetime
-from app.config import DB_BACKUP_PATH, EXPORTS_PATH
-from database.db import insertTransaction, backupDB
+from app.config import DB_BACKUP_DIR, EXPORTS_PATH
+from database.db import insertTransaction, startBackup
 from app.utils.exports import export_transactions_to_csv, export_transactions_to_excel, export_transactions_to_pdf
 from app.utils.import_csv import import_csv
-from app.utils.feedmessages import generateFeedMessages
+from app.utils.feedmessages import FeedTotals, generateFeedMessages
 from CTkMessagebox import CTkMessagebox
 import tkinter.filedialog as filedialog
 import os
+import sqlite3
 import threading
 
 class homeScreen(ctk.CTkFrame):
@@ -22,6 +23,7 @@ class homeScreen(ctk.CTkFrame):
         self.filenameEntry = None
         self.feedFrame = None
         self.feedLabels = []
+        self.feedTotals = None
         self.greetLabel = None
         self.selected_file = None
 
@@ -37,7 +39,8 @@ class homeScreen(ctk.CTkFrame):
 
         utilityFrame = ctk.CTkFrame(self, fg_color="transparent")
         utilityFrame.grid(row=0, column=0, sticky="sw")
-        ctk.CTkButton(utilityFrame, text="Backup Database", command=self.backupDatabase).pack(side="left", padx=(10, 5))
+        self.backupButton = ctk.CTkButton(utilityFrame, text="Backup Database", command=self.backupDatabase)
+        self.backupButton.pack(side="left", padx=(10, 5))
         self.import_button = ctk.CTkButton(utilityFrame, text="Import CSV", command=self.import_data)
         self.import_button.pack(side="left", padx=5)
 
@@ -139,8 +142,10 @@ class homeScreen(ctk.CTkFrame):
             self.greetLabel.configure(text=greetingText)
 
         if self.app.currentUser:
-            user_id = self.app.getUserID()
-            feedMessages = generateFeedMessages(user_id)
+            session = self.app.session
+            if self.feedTotals is None or self.feedTotals.session is not session:
+                self.feedTotals = FeedTotals(session)
+            feedMessages = generateFeedMessages(session, self.feedTotals)
             for message in feedMessages:
                 label = ctk.CTkLabel(self.feedFrame, text=message, wraplength=800, justify="left")
                 label.pack(anchor=ctk.W, padx=10, pady=5)
@@ -176,24 +181,48 @@ class homeScreen(ctk.CTkFrame):
             error.after(2000, error.destroy)
             return
 
-        user_id = self.app.getUserID()
+        session = self.app.session
         try:
-            insertTransaction(date, category, description, amount, type_, user_id)
+            _, created = insertTransaction(date, category, description, amount, type_, session)
+            if not created:
+                error = ctk.CTkLabel(self.addTransactionMessageFrame, text="Duplicate transaction, not added!", text_color="red")
+                error.pack()
+                error.after(2000, error.destroy)
+                return
             success = ctk.CTkLabel(self.addTransactionMessageFrame, text="Transaction added!", text_color="green")
             success.pack()
             success.after(2000, success.destroy)
-            self.updateFeed()
         except ValueError as e:
             CTkMessagebox(title="Error", message=str(e), icon="cancel")
+        except sqlite3.OperationalError as e:
+            # e.g. the database stayed locked past the busy timeout while a password change swapped the keys.
+            CTkMessagebox(title="Error", message=f"The transaction could not be saved, please try again: {str(e)}", icon="cancel")
 
-        self.updateFeed()
+    def onTransactionsChanged(self, event):
+        # Only a change in one of the months the feed compares rebuilds it.
+        if self.feedTotals is not None and self.feedTotals.invalidate(event):
+            self.updateFeed()
 
     def backupDatabase(self):
-        try:
-            backupDB()
-            CTkMessagebox(title="Success", message=f"Database has been successfully backed up to {DB_BACKUP_PATH}", icon="check")
-        except Exception as e:
-            CTkMessagebox(title="Error", message=f"Backup failed: {str(e)}", icon="cancel")
+        self.backupButton.configure(state="disabled", text="Backing up...")
+        startBackup(
+            progress=lambda phase, done, total: self.after(0, self._on_backup_progress, phase, done, total),
+            onComplete=lambda path, error: self.after(0, self._on_backup_complete, path, error)
+        )
+
+    def _on_backup_progress(self, phase, done, total):
+        percent = int(done * 100 / total) if total else 100
+        label = "Copying" if phase == "copy" else "Compressing"
+        self.backupButton.configure(text=f"{label}... {percent}%")
+
+    def _on_backup_complete(self, path, error):
+        self.backupButton.configure(state="normal", text="Backup Database")
+        if error is not None:
+            CTkMessagebox(title="Error", message=f"Backup failed: {str(error)}", icon="cancel")
+        elif path is None:
+            CTkMessagebox(title="Backup", message=f"No changes since the last backup in {DB_BACKUP_DIR}", icon="info")
+        else:
+            CTkMessagebox(title="Success", message=f"Database has been successfully backed up to {path}", icon="check")
 
     def import_data(self):
         file_path = filedialog.askopenfilename(title="Select CSV file to import", filetypes=[("CSV files", "*.csv"), ("All files", "*.*")], initialdir=os.path.expanduser("~"))
@@ -210,10 +239,10 @@ class homeScreen(ctk.CTkFrame):
         import_thread.start()
 
     def _import_in_background(self, file_path):
-        user_id = self.app.getUserID()
+        session = self.app.session
 
         try:
-            imported_count, errors = import_csv(user_id, file_path)
+            imported_count, errors = import_csv(session, file_path)
 
             self.after(0, self._on_import_complete, imported_count, errors)
 
@@ -231,24 +260,23 @@ class homeScreen(ctk.CTkFrame):
         else:
                 CTkMessagebox(title="No imports", message="No new transactions found to import", icon="info")
 
-        self.updateFeed()
-
     def _on_import_error(self, error_message):
         self.import_button.configure(state="normal", text="Import CSV")
         CTkMessagebox(title="No imports", message=f'{error_message}', icon="cancel")
 
     def export(self, formatType):
-        user_id = self.app.getUserID()
+        session = self.app.session
         filename = self.filenameEntry.get()
         if formatType == 'csv':
-            export_transactions_to_csv(user_id, filename)
+            export_transactions_to_csv(session, filename)
         elif formatType == 'pdf':
-            export_transactions_to_pdf(user_id, filename)
+            export_transactions_to_pdf(session, filename)
         elif formatType == 'excel':
-            export_transactions_to_excel(user_id, filename)
+            export_transactions_to_excel(session, filename)
         CTkMessagebox(title="Success", message=f"Exported to {formatType.upper()} at {EXPORTS_PATH}!", icon="check")
 
     def clearEntries(self):
+        self.feedTotals = None
         self.dateEntry.delete(0, "end")
         self.amountEntry.delete(0, "end")
         self.categoryEntry.delete(0, "end")
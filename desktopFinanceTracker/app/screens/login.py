@@ -24,10 +24,16 @@ class loginScreen(ctk.CTkFrame):
         self.passwordEntry = ctk.CTkEntry(self.centerFrame, show="*", placeholder_text="Password")
         self.passwordEntry.pack()
         self.passwordEntry.bind("<Return>", lambda _: self.handleLogin())
-        ctk.CTkButton(self.centerFrame, text="Login", command=self.handleLogin, corner_radius=0).pack(pady=(50, 5))
+        self.loginButton = ctk.CTkButton(self.centerFrame, text="Login", command=self.handleLogin, corner_radius=0)
+        self.loginButton.pack(pady=(50, 5))
         ctk.CTkButton(self.centerFrame, text="Register", command=lambda: self.app.showFrame("register"), corner_radius=0).pack(pady=5)
+        self.progressBar = ctk.CTkProgressBar(self.centerFrame, mode="indeterminate", width=140)
+        self.loggingIn = False
 
     def handleLogin(self):
+        if self.loggingIn:
+            return
+
         username = self.usernameEntry.get()
         password = self.passwordEntry.get()
 
@@ -35,12 +41,26 @@ class loginScreen(ctk.CTkFrame):
             error = ctk.CTkLabel(self.centerFrame, text="Enter username and/or password!", text_color="red")
             error.pack()
             error.after(2000, error.destroy)
+            return
+
+        self.loggingIn = True
+        self.loginButton.configure(state="disabled", text="Logging in...")
+        self.progressBar.pack(pady=10)
+        self.progressBar.start()
+        self.app.login(username, password, self.onLoginComplete)
+
+    def onLoginComplete(self, success):
+        self.loggingIn = False
+        if not self.winfo_exists():
+            return
+        self.progressBar.stop()
+        self.progressBar.pack_forget()
+        self.loginButton.configure(state="normal", text="Login")
 
-        if self.app.login(username, password):
+        if success:
             success = ctk.CTkLabel(self.centerFrame, text="Login successful!", text_color="green")
             success.pack()
             success.after(2000, success.destroy)
-            lambda: self.app.showFrame("home")
         else:
             error = ctk.CTkLabel(self.centerFrame, text="Invalid username or password!", text_color="red")
             error.pack()
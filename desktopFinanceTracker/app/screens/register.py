@@ -1,5 +1,6 @@
 import customtkinter as ctk
-from database.db import insertUser
+import threading
+from database.db import insertUser, connections
 
 class registerScreen(ctk.CTkFrame):
     def __init__(self, parent, app):
@@ -30,7 +31,8 @@ class registerScreen(ctk.CTkFrame):
         self.confirmPasswordEntry = ctk.CTkEntry(self.centerFrame, show="*", placeholder_text="Password")
         self.confirmPasswordEntry.pack()
 
-        ctk.CTkButton(self.centerFrame, text="Register", command=self.handleRegister, corner_radius=0).pack(pady=(50, 5))
+        self.registerButton = ctk.CTkButton(self.centerFrame, text="Register", command=self.handleRegister, corner_radius=0)
+        self.registerButton.pack(pady=(50, 5))
         ctk.CTkButton(self.centerFrame, text="Back to Login", command=lambda: self.app.showFrame("login"), corner_radius=0).pack(pady=5)
 
     def handleRegister(self):
@@ -50,7 +52,20 @@ class registerScreen(ctk.CTkFrame):
             error.after(3000, error.destroy)
             return
 
-        success = insertUser(username, password)
+        # Hashing the password with bcrypt takes a noticeable moment, so it runs off the Tk thread.
+        self.registerButton.configure(state="disabled", text="Registering...")
+
+        def run():
+            try:
+                success, message = insertUser(username, password)
+            finally:
+                connections.closeThreadConnection()
+            self.after(0, lambda: self.onRegisterComplete(success, message))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def onRegisterComplete(self, success, message):
+        self.registerButton.configure(state="normal", text="Register")
         if success:
             self.app.showFrame("login")
             loginFrame = self.app.frames["login"]
@@ -64,7 +79,7 @@ class registerScreen(ctk.CTkFrame):
             success.after(3000, success.destroy)
             self.clearEntries()
         else:
-            error = ctk.CTkLabel(self.centerFrame, text="Registration failed!", text_color="red")
+            error = ctk.CTkLabel(self.centerFrame, text=message or "Registration failed!", text_color="red")
             error.pack()
             error.after(3000, error.destroy)
 
@@ -1,15 +1,40 @@
 import customtkinter as ctk
 import tkinter as tk
-import datetime
-from database.db import viewAllTransactions, deleteTransactionsByID
+import sqlite3
+import threading
+import numpy as np
+from database.db import connections, viewAllTransactions, deleteTransactionsByID, searchTransactionIds
+from database.events import TransactionsInserted, TransactionsDeleted
+from app.utils.transactiontable import TransactionTable
 from CTkMessagebox import CTkMessagebox
 
+ROW_HEIGHT = 22
+HEADING_HEIGHT = 26
+VISIBLE_BUFFER_ROWS = 5
+WHEEL_ROWS = 3
+SEARCH_DEBOUNCE_MS = 150
+
 class transactionsScreen(ctk.CTkFrame):
     def __init__(self, parent, app):
         super().__init__(parent, corner_radius=0, fg_color="#101010")
         self.app = app
         self.tree = None
+        self.scrollbar = None
         self.searchbarEntry = None
+        self.table = TransactionTable()
+        self.view = np.empty(0, dtype=np.int64)
+        self.slots = []
+        self.detachedSlots = set()
+        self.selectedIds = set()
+        self.anchorIndex = None
+        self.offset = 0
+        self.sortColumn = None
+        self.sortReverse = False
+        self.tableSession = None
+        self.matchingIds = None
+        self.matchingQuery = None
+        self.searchAfterId = None
+        self.searchGeneration = 0
 
         self.buildUI()
 
@@ -30,7 +55,7 @@ class transactionsScreen(ctk.CTkFrame):
         style.theme_use("clam")
         style.layout("Edge.Treeview", [("Edge.Treeview.treearea", {"sticky": "nsew"})])
         style.configure("Edge.Treeview", highlightthickness=0, bd=0)
-        style.configure("Treeview", background="#181818", foreground="white", fieldbackground="#181818")
+        style.configure("Treeview", background="#181818", foreground="white", fieldbackground="#181818", rowheight=ROW_HEIGHT)
         style.configure("Dark.Vertical.TScrollbar",
                         gripcount=0,
                         background="#404040",
@@ -47,34 +72,31 @@ class transactionsScreen(ctk.CTkFrame):
         style.map("Dark.Vertical.TScrollbar", background=[('active', '#505050'), ('pressed', '#303030')])
 
         columns = ("c1", "c2", "c3", "c4", "c5", "c6")
-        self.tree = tk.ttk.Treeview(self, column=columns, show="headings", style="Edge.Treeview")
+        self.tree = tk.ttk.Treeview(self, column=columns, show="headings", style="Edge.Treeview", selectmode="none")
         headers = ["ID", "Date", "Category", "Description", "Amount", "Type"]
 
-        verticalScrollbar = tk.ttk.Scrollbar(self, orient="vertical", command=self.tree.yview, style="Dark.Vertical.TScrollbar")
-        self.tree.configure(yscrollcommand=verticalScrollbar.set)
-
-        def treeviewSortColumn(tv, col, col_index, reverse):
-            data = [(tv.set(k, col), k) for k in tv.get_children("")]
-            if col == "c2":
-                try:
-                    data.sort(key=lambda t: datetime.datetime.strptime(t[0], "%d-%m-%Y"), reverse=reverse)
-                except Exception:
-                    data.sort(reverse=reverse)
-            else:
-                try:
-                    data.sort(key=lambda t: float(t[0].replace(",", "").replace("€", "")), reverse=reverse)
-                except ValueError:
-                    data.sort(reverse=reverse)
-            for index, (val, k) in enumerate(data):
-                tv.move(k, "", index)
-            tv.heading(col, command=lambda: treeviewSortColumn(tv, col, col_index, not reverse))
+        # The scrollbar drives self.offset rather than the Treeview, which only ever holds one screenful of items.
+        self.scrollbar = tk.ttk.Scrollbar(self, orient="vertical", command=self.onScrollbar, style="Dark.Vertical.TScrollbar")
 
         for idx, (col, header) in enumerate(zip(columns, headers)):
-            self.tree.heading(col, text=header, command=lambda _col=col, _idx=idx: treeviewSortColumn(self.tree, _col, _idx, False))
+            self.tree.heading(col, text=header, command=lambda _idx=idx: self.sortBy(_idx))
             self.tree.column(col, anchor=ctk.CENTER)
 
         self.tree.pack(side="left", expand=True, fill="both")
-        verticalScrollbar.pack(side="right", fill="y")
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.tree.bind("<Configure>", lambda _: self.resizeSlots())
+        self.tree.bind("<MouseWheel>", lambda event: self.scrollBy(-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS))
+        self.tree.bind("<Button-4>", lambda _: self.scrollBy(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda _: self.scrollBy(WHEEL_ROWS))
+        self.tree.bind("<Up>", lambda _: self.scrollBy(-1))
+        self.tree.bind("<Down>", lambda _: self.scrollBy(1))
+        self.tree.bind("<Prior>", lambda _: self.scrollBy(-self.visibleRows()))
+        self.tree.bind("<Next>", lambda _: self.scrollBy(self.visibleRows()))
+        self.tree.bind("<Button-1>", self.onClick)
+        self.tree.bind("<Shift-Button-1>", lambda event: self.onClick(event, extend=True))
+        self.tree.bind("<Control-Button-1>", lambda event: self.onClick(event, toggle=True))
+        self.tree.bind("<Control-a>", self.selectAll)
 
         deleteButton = ctk.CTkButton(searchbarFrame, text="Delete", font=ctk.CTkFont(size=12), fg_color="#D10000", hover_color="#9B0000", width=60, command=self.deleteSelectedTransactions)
         deleteButton.grid(row=0, column=0, padx=(0, 10), sticky="w")
@@ -86,48 +108,207 @@ class transactionsScreen(ctk.CTkFrame):
         self.searchbarEntry.grid(row=0, column=2, padx=(3, 0), sticky="ew")
         self.searchbarEntry.bind("<KeyRelease>", self.filterTableBySearch)
 
+    # The table is virtual: all rows live in self.table and self.view holds the positions of the filtered rows
+    # in sorted order. The Treeview only holds a fixed set of item slots for the rows in the viewport plus a small buffer. Scrolling
+    # rewrites the values of those slots instead of inserting items, and selection is kept as a set of ids so
+    # that it survives scrolling, sorting and filtering.
+    def visibleRows(self):
+        return max(1, (self.tree.winfo_height() - HEADING_HEIGHT) // ROW_HEIGHT)
+
+    def resizeSlots(self):
+        wanted = self.visibleRows() + VISIBLE_BUFFER_ROWS
+        while len(self.slots) < wanted:
+            self.slots.append(self.tree.insert("", ctk.END, values=()))
+        while len(self.slots) > wanted:
+            self.tree.delete(self.slots.pop())
+            self.detachedSlots.intersection_update(self.slots)
+        self.render()
+
+    def render(self):
+        self.offset = max(0, min(self.offset, len(self.view) - self.visibleRows()))
+        selectedSlots = []
+        for position, slot in enumerate(self.slots):
+            index = self.offset + position
+            if index < len(self.view):
+                row = self.table.rows[self.view[index]]
+                self.tree.item(slot, values=row)
+                if slot in self.detachedSlots:
+                    self.tree.move(slot, "", position)
+                    self.detachedSlots.discard(slot)
+                if row[0] in self.selectedIds:
+                    selectedSlots.append(slot)
+            elif slot not in self.detachedSlots:
+                self.tree.detach(slot)
+                self.detachedSlots.add(slot)
+        self.tree.selection_set(selectedSlots)
+
+        if len(self.view):
+            self.scrollbar.set(self.offset / len(self.view), min(1.0, (self.offset + self.visibleRows()) / len(self.view)))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scrollBy(self, rows):
+        self.offset += rows
+        self.render()
+        return "break"
+
+    def onScrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.offset = int(float(amount) * len(self.view))
+        elif unit == "pages":
+            self.offset += int(amount) * self.visibleRows()
+        else:
+            self.offset += int(amount)
+        self.render()
+
+    def onClick(self, event, extend=False, toggle=False):
+        if self.tree.identify_region(event.x, event.y) == "heading":
+            return None
+        self.tree.focus_set()
+        slot = self.tree.identify_row(event.y)
+        if not slot or slot not in self.slots:
+            return "break"
+        index = self.offset + self.slots.index(slot)
+        if index >= len(self.view):
+            return "break"
+
+        rowId = int(self.table.ids[self.view[index]])
+        if extend and self.anchorIndex is not None:
+            low, high = sorted((self.anchorIndex, index))
+            self.selectedIds = set(self.table.ids[self.view[low:high + 1]].tolist())
+        elif toggle:
+            self.selectedIds ^= {rowId}
+            self.anchorIndex = index
+        else:
+            self.selectedIds = {rowId}
+            self.anchorIndex = index
+        self.render()
+        return "break"
+
+    def selectAll(self, event=None):
+        self.selectedIds = set(self.table.ids[self.view].tolist())
+        self.render()
+        return "break"
+
+    def sortBy(self, columnIndex):
+        self.sortReverse = not self.sortReverse if self.sortColumn == columnIndex else False
+        self.sortColumn = columnIndex
+        self.applyView()
+
+    def applyView(self):
+        self.view = self.table.view(self.sortColumn, self.sortReverse, self.matchingIds)
+        if self.selectedIds:
+            self.selectedIds &= set(self.table.ids[self.view].tolist())
+        self.anchorIndex = None
+        self.render()
+
     def fillTable(self, data=None):
         if not self.app.currentUser:
-            self.tree.delete(*self.tree.get_children())
-            return
-        user_id = self.app.getUserID()
-        all_rows = viewAllTransactions(user_id)
-        self.tree.delete(*self.tree.get_children())
-        data = data if data is not None else all_rows
-        for row in data:
-            self.tree.insert("", ctk.END, values=row)
+            self.table = TransactionTable()
+            self.tableSession = None
+        else:
+            session = self.app.session
+            self.table = TransactionTable(data if data is not None else viewAllTransactions(session))
+            self.tableSession = session
+        self.applyView()
+        if self.matchingIds is not None:
+            self.runSearch(resetOffset=False)
 
     def filterTableBySearch(self, event=None):
+        # Typing only restarts the timer; the search runs once the keystrokes pause.
         if not self.app.currentUser:
             return
-        user_id = self.app.getUserID()
-        all_rows = viewAllTransactions(user_id)
-        query = self.searchbarEntry.get().strip().lower()
+        self.cancelSearch()
+        self.searchAfterId = self.after(SEARCH_DEBOUNCE_MS, self.runSearch)
+
+    def cancelSearch(self):
+        if self.searchAfterId is not None:
+            self.after_cancel(self.searchAfterId)
+            self.searchAfterId = None
+        # A search already running in the background finishes, but its result is dropped.
+        self.searchGeneration += 1
+
+    def runSearch(self, resetOffset=True):
+        self.searchAfterId = None
+        self.searchGeneration += 1
+        generation = self.searchGeneration
+        query = self.searchbarEntry.get().strip()
         if not query:
-            self.fillTable(all_rows)
+            self.showSearchResults(generation, None, None, resetOffset)
+            return
+
+        session = self.app.session
+        def run():
+            try:
+                ids = searchTransactionIds(query, session)
+            finally:
+                connections.closeThreadConnection()
+            self.after(0, lambda: self.showSearchResults(generation, query, ids, resetOffset))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def showSearchResults(self, generation, query, ids, resetOffset):
+        if generation != self.searchGeneration:
             return
-        filteredData = [row for row in all_rows if any(query in str(cell).lower() for cell in row)]
-        self.fillTable(filteredData)
+        self.matchingQuery = query
+        self.matchingIds = ids
+        if resetOffset:
+            self.offset = 0
+        self.applyView()
 
     def deleteSelectedTransactions(self):
-        selected_items = self.tree.selection()
-        if not selected_items:
+        idsToDelete = [rowId for rowId in self.table.ids[self.view].tolist() if rowId in self.selectedIds]
+        if not idsToDelete:
             CTkMessagebox(title="Nothing selected", message="Please select at least one transaction to delete.", icon="info")
             return
 
-        idsToDelete = [int(self.tree.item(item, "values")[0]) for item in selected_items]
-
         confirmation = CTkMessagebox(title="Confirm delete", message=f"Delete {len(idsToDelete)} selected transaction(s)?", icon="warning", option_1="Cancel", option_2="Delete").get()
         if confirmation != "Delete":
             return
 
-        user_id = self.app.getUserID()
-        deleteTransactionsByID(user_id, idsToDelete)
-        self.fillTable()
-        self.app.frames["home"].updateFeed()
+        session = self.app.session
+        try:
+            removed = deleteTransactionsByID(session, idsToDelete)
+        except sqlite3.OperationalError as e:
+            CTkMessagebox(title="Error", message=f"The transactions could not be deleted, please try again: {str(e)}", icon="cancel")
+            return
+        self.selectedIds.clear()
+        CTkMessagebox(title="Deleted", message=f"{removed} transaction(s) deleted.", icon="check")
 
     def updateTable(self):
-        self.fillTable()
+        # Once loaded, the table is kept current by onTransactionsChanged and is only reloaded for a new session.
+        if self.tableSession is not self.app.session:
+            self.fillTable()
+
+    def onTransactionsChanged(self, event):
+        if self.tableSession is None:
+            return
+        if isinstance(event, TransactionsInserted):
+            self.table.append(event.rows)
+            if self.matchingIds is not None:
+                query = self.matchingQuery.lower()
+                self.matchingIds |= {row[0] for row in event.rows if any(query in str(cell).lower() for cell in row)}
+        elif isinstance(event, TransactionsDeleted):
+            removedIds = [row[0] for row in event.rows]
+            self.table.remove(removedIds)
+            self.selectedIds.difference_update(removedIds)
+            if self.matchingIds is not None:
+                self.matchingIds.difference_update(removedIds)
+        else:
+            self.table = TransactionTable()
+            self.selectedIds.clear()
+            if self.matchingIds is not None:
+                self.matchingIds = set()
+        self.applyView()
 
     def clearEntries(self):
-        self.searchbarEntry.delete(0, "end")
\ No newline at end of file
+        self.cancelSearch()
+        self.tableSession = None
+        self.matchingIds = None
+        self.matchingQuery = None
+        self.searchbarEntry.delete(0, "end")
+        self.table = TransactionTable()
+        self.view = np.empty(0, dtype=np.int64)
+        self.selectedIds.clear()
+        self.offset = 0
+        self.render()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+
+STARTUP_BUDGET_SECONDS = 1.0
+REPORTED_IMPORTS = 15
+
+class ImportTimer:
+    # Times every module first imported through an import statement while installed, like python -X importtime:
+    # inclusive is the time until the import returned, self that time minus the imports it made in turn.
+    # Only the standard library is imported here, so main.py can install it before anything else loads.
+    def __init__(self):
+        self.records = []
+        self._original = None
+        self._local = threading.local()
+
+    def install(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        try:
+            module = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__")) if level else name
+        except (ImportError, ValueError):
+            module = name
+        if module in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            inclusive = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += inclusive
+            self.records.append((module, start, inclusive, inclusive - nested, len(stack), threading.get_ident()))
+
+def startupReport(timer, startedAt, shownAt):
+    # Time from launch until the login screen was shown and the imports that cost the most of it.
+    elapsed = shownAt - startedAt
+    imported = sum(inclusive for _, _, inclusive, _, depth, _ in timer.records if depth == 0)
+    lines = [f"Startup: login screen shown after {elapsed:.3f}s ({imported:.3f}s importing {len(timer.records)} modules)"]
+    if elapsed > STARTUP_BUDGET_SECONDS:
+        lines[0] += f", over the {STARTUP_BUDGET_SECONDS:.1f}s budget"
+    slowest = sorted(timer.records, key=lambda record: record[3], reverse=True)[:REPORTED_IMPORTS]
+    lines.append(f"  {'self':>8} {'inclusive':>10}  module")
+    for module, _, inclusive, self_time, _, _ in slowest:
+        lines.append(f"  {self_time:>7.3f}s {inclusive:>9.3f}s  {module}")
+    return "\n".join(lines)
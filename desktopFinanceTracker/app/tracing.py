@@ -0,0 +1,81 @@
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+TRACE_ENV = "FINANCE_TRACKER_TRACE"
+
+# The active tracer, set by start. None unless the app was launched with --trace or FINANCE_TRACKER_TRACE.
+tracer = None
+
+class Tracer:
+    # Collects timed spans as Chrome trace events: complete ("X") events in microseconds since launch, one track
+    # per thread. The written file opens in chrome://tracing or ui.perfetto.dev.
+    def __init__(self, path, origin=None):
+        self.path = Path(path)
+        self.origin = time.perf_counter() if origin is None else origin
+        self.pid = os.getpid()
+        self.events = []
+        self.threadNames = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, category, start, duration, thread=None, **args):
+        if thread is None:
+            thread = threading.get_ident()
+            self.threadNames.setdefault(thread, threading.current_thread().name)
+        event = {"name": name, "cat": category, "ph": "X", "ts": (start - self.origin) * 1e6, "dur": duration * 1e6, "pid": self.pid, "tid": thread}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, category, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, category, start, time.perf_counter() - start, **args)
+
+    def recordImports(self, importTimer):
+        for module, start, inclusive, selfTime, _, thread in importTimer.records:
+            self.record(module, "import", start, inclusive, thread, selfMs=round(selfTime * 1e3, 3))
+
+    def write(self):
+        with self._lock:
+            events = list(self.events)
+        events += [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": thread, "args": {"name": name}} for thread, name in self.threadNames.items()]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+        return self.path
+
+def defaultTracePath():
+    from app.config import TRACES_PATH
+    return TRACES_PATH / f"trace-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+
+def start(path=None, origin=None):
+    global tracer
+    tracer = Tracer(path or defaultTracePath(), origin)
+    return tracer
+
+def span(name, category, **args):
+    if tracer is None:
+        return nullcontext()
+    return tracer.span(name, category, **args)
+
+def traced(category):
+    # Records every call of the decorated function as a span named after it. Costs one check when tracing is off.
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if tracer is None:
+                return function(*args, **kwargs)
+            with tracer.span(function.__qualname__, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
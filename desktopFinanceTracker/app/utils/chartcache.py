@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+from app.config import CHART_CACHE_MB
+
+class ChartCache:
+    # Least recently used store for the charts screen: prepared chart data and rendered chart images, each put with
+    # its size in bytes and evicted oldest first once the total passes maxMB. Keys start with the user id and end
+    # with the session's data version (session.events.version), so an entry from before a change can never be
+    # returned; dropStale frees those entries once the change has been published.
+    def __init__(self, maxMB=CHART_CACHE_MB):
+        self.maxBytes = maxMB * 1024 * 1024
+        self.size = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size):
+        with self._lock:
+            self._discard(key)
+            if size > self.maxBytes:
+                return
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.maxBytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def dropStale(self, userId, version):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == userId and key[-1] < version]:
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
@@ -1,94 +1,52 @@
-import sqlite3
 from pathlib import Path
 import csv
-import openpyxl
-from fpdf import FPDF
-from app.config import EXPORTS_PATH, DB_PATH
-from cryptography.fernet import Fernet
-
-def export_transactions_to_csv(user_id, filename):
-    from database.db import encryption_key
-    fernet = Fernet(encryption_key)
-    connect_to_database = sqlite3.connect(DB_PATH)
-    db_cursor = connect_to_database.cursor()
-    db_cursor.execute('SELECT id, date, category, description, amount, type FROM transactions WHERE user_id = ?', (user_id,))
-    rows = db_cursor.fetchall()
-    connect_to_database.close()
-
-    decrypted_rows = []
-    for row in rows:
-        decrypted_date = fernet.decrypt(row[1].encode()).decode()
-        decrypted_category = fernet.decrypt(row[2].encode()).decode()
-        decrypted_description = fernet.decrypt(row[3].encode()).decode()
-        decrypted_amount = float(fernet.decrypt(row[4].encode()).decode())
-        decrypted_rows.append((row[0], decrypted_date, decrypted_category, decrypted_description, decrypted_amount, row[5]))
+from app.config import EXPORTS_PATH
+from database.db import iterTransactions
 
+def export_transactions_to_csv(session, filename):
     if not filename.endswith('.csv'):
         filename += '.csv'
     filepath = EXPORTS_PATH / filename
     EXPORTS_PATH.mkdir(exist_ok=True)
 
+    exported_count = 0
     with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.writer(csvfile, delimiter=';')
         writer.writerow(['ID', 'Date', 'Category', 'Description', 'Amount', 'Type'])
-        for row in decrypted_rows:
+        for row in iterTransactions(session):
             writer.writerow(row)
+            exported_count += 1
 
-    return decrypted_rows
-
-def export_transactions_to_excel(user_id, filename):
-    from database.db import encryption_key
-    fernet = Fernet(encryption_key)
-    connect_to_database = sqlite3.connect(DB_PATH)
-    db_cursor = connect_to_database.cursor()
-    db_cursor.execute('SELECT id, date, category, description, amount, type FROM transactions WHERE user_id = ?', (user_id,))
-    rows = db_cursor.fetchall()
-    connect_to_database.close()
-
-    decrypted_rows = []
-    for row in rows:
-        decrypted_date = fernet.decrypt(row[1].encode()).decode()
-        decrypted_category = fernet.decrypt(row[2].encode()).decode()
-        decrypted_description = fernet.decrypt(row[3].encode()).decode()
-        decrypted_amount = float(fernet.decrypt(row[4].encode()).decode())
-        decrypted_rows.append((row[0], decrypted_date, decrypted_category, decrypted_description, decrypted_amount, row[5]))
+    return exported_count
 
+def export_transactions_to_excel(session, filename):
     if not filename.endswith('xlsx'):
         filename += '.xlsx'
     filepath = EXPORTS_PATH / filename
     EXPORTS_PATH.mkdir(exist_ok=True)
 
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
+    import openpyxl
+
+    # Write-only workbooks stream rows to disk instead of keeping every cell object in memory.
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
     worksheet.append(['ID', 'Date', 'Category', 'Description', 'Amount', 'Type'])
-    for row in decrypted_rows:
-        worksheet.append(row)
+    exported_count = 0
+    for row in iterTransactions(session):
+        worksheet.append(list(row))
+        exported_count += 1
     workbook.save(filepath)
 
-    return decrypted_rows
-
-def export_transactions_to_pdf(user_id, filename):
-    from database.db import encryption_key
-    fernet = Fernet(encryption_key)
-    connect_to_database = sqlite3.connect(DB_PATH)
-    db_cursor = connect_to_database.cursor()
-    db_cursor.execute('SELECT id, date, category, description, amount, type FROM transactions WHERE user_id = ?', (user_id,))
-    rows = db_cursor.fetchall()
-    connect_to_database.close()
-
-    decrypted_rows = []
-    for row in rows:
-        decrypted_date = fernet.decrypt(row[1].encode()).decode()
-        decrypted_category = fernet.decrypt(row[2].encode()).decode()
-        decrypted_description = fernet.decrypt(row[3].encode()).decode()
-        decrypted_amount = float(fernet.decrypt(row[4].encode()).decode())
-        decrypted_rows.append((row[0], decrypted_date, decrypted_category, decrypted_description, decrypted_amount, row[5]))
+    return exported_count
 
+def export_transactions_to_pdf(session, filename):
     if not filename.endswith('.pdf'):
         filename += '.pdf'
     filepath = EXPORTS_PATH / filename
     EXPORTS_PATH.mkdir(exist_ok=True)
 
+    from fpdf import FPDF
+
     pdf = FPDF()
     pdf.add_page()
     pdf.set_font("Arial", size=12)
@@ -103,7 +61,8 @@ def export_transactions_to_pdf(user_id, filename):
     pdf.cell(30, 10, headers[4], 1)
     pdf.cell(30, 10, headers[5], 1)
     pdf.ln()
-    for row in decrypted_rows:
+    exported_count = 0
+    for row in iterTransactions(session):
         pdf.cell(10, 10, str(row[0]), 1)
         pdf.cell(30, 10, row[1], 1)
         pdf.cell(30, 10, row[2], 1)
@@ -111,6 +70,7 @@ def export_transactions_to_pdf(user_id, filename):
         pdf.cell(30, 10, str(row[4]), 1)
         pdf.cell(30, 10, row[5], 1)
         pdf.ln()
+        exported_count += 1
     pdf.output(filepath)
 
-    return decrypted_rows
\ No newline at end of file
+    return exported_count
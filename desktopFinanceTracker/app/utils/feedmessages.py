@@ -1,29 +1,60 @@
 import datetime
 from database.db import viewTransactionsByMonth
+from database.cache import parseOrdinal
+from database.events import TransactionsCleared
 
-def generateFeedMessages(user_id):
+def combine(rows):
+    description_totals = {}
+
+    for row in rows:
+        description = row[3]
+        amount = row[4]
+        transaction_type = row[5]
+        if transaction_type == "expense":
+            description_totals[description] = description_totals.get(description, 0) + abs(amount)
+    return description_totals
+
+def monthOf(date):
+    ordinal = parseOrdinal(date)
+    if not ordinal:
+        return None
+    day = datetime.date.fromordinal(ordinal)
+    return day.year, day.month
+
+class FeedTotals:
+    # Expense totals per description for every month the feed has looked at. A change event only drops the
+    # months its rows fall in, so the next feed recomputes those and reuses the others.
+    def __init__(self, session):
+        self.session = session
+        self.months = {}
+
+    def totals(self, month, year):
+        key = (year, month)
+        if key not in self.months:
+            self.months[key] = combine(viewTransactionsByMonth(month, year, self.session))
+        return self.months[key]
+
+    def invalidate(self, event):
+        # Returns whether a month the feed has shown was affected.
+        if isinstance(event, TransactionsCleared):
+            affected = set(self.months)
+        else:
+            affected = {monthOf(row[1]) for row in event.rows} & set(self.months)
+        for key in affected:
+            del self.months[key]
+        return bool(affected)
+
+def generateFeedMessages(session, totals=None):
+    if totals is None:
+        totals = FeedTotals(session)
     now = datetime.datetime.now()
     this_month = now.month
     this_year = now.year
     last_month = this_month - 1 if this_month > 1 else 12
     last_month_year = this_year if this_month > 1 else this_year - 1
 
-    this_month_rows = viewTransactionsByMonth(this_month, this_year, user_id)
-    last_month_rows = viewTransactionsByMonth(last_month, last_month_year, user_id)
-
-    def combine(rows):
-        description_totals = {}
-
-        for row in rows:
-            description = row[3]
-            amount = row[4]
-            transaction_type = row[5]
-            if transaction_type == "expense":
-                description_totals[description] = description_totals.get(description, 0) + abs(amount)
-        return description_totals
-
-    this_month_totals = combine(this_month_rows)
-    last_month_totals = combine(last_month_rows)
+    this_month_totals = totals.totals(this_month, this_year)
+    last_month_totals = totals.totals(last_month, last_month_year)
 
     feed = []
     for description in set(this_month_totals) | set(last_month_totals):
@@ -1,11 +1,25 @@
 import csv
+import sqlite3
 from datetime import datetime
-from database.db import insertTransaction
+from database.db import insertTransactions, TRANSACTION_CREATED, TRANSACTION_ERROR
 
-def import_csv(user_id, file_path):
+IMPORT_BATCH_SIZE = 5000
+
+def import_csv(session, file_path):
     imported_count = 0
     errors = []
 
+    def flush(transactions):
+        nonlocal imported_count
+        # Within a batch, rows are stored oldest first so that ids follow the calendar.
+        transactions.sort(key=lambda x: datetime.strptime(x['date'], "%d-%m-%Y"))
+        for status, message in insertTransactions(transactions, session):
+            if status == TRANSACTION_CREATED:
+                imported_count += 1
+            elif status == TRANSACTION_ERROR:
+                errors.append(f'Error saving: {message}')
+        transactions.clear()
+
     if file_path is None:
         return 0, ['No file selected']
     
@@ -54,30 +68,23 @@ def import_csv(user_id, file_path):
                         'type': type_
                     })
                 except ValueError as ve:
-                    errors.append(f'Row {row_num}: Invalid date "{date}"')
+                    errors.append(f'Row {row_num}: Invalid date "{date_str}"')
                     continue
 
-            transactions.sort(key=lambda x: x['date'])
+                if len(transactions) >= IMPORT_BATCH_SIZE:
+                    flush(transactions)
 
-            for transaction in transactions:
-                try:
-                    _, created = insertTransaction(
-                        date=transaction['date'],
-                        category=transaction['category'],
-                        description=transaction['description'],
-                        amount=transaction['amount'],
-                        type_=transaction['type'],
-                        user_id=user_id
-                    )
-                    if created:
-                        imported_count += 1
-                except Exception as e:
-                    errors.append(f'Error saving: {str(e)}')
-                    continue
+            if transactions:
+                flush(transactions)
 
     except FileNotFoundError:
         return 0, [f'File not found: {file_path}']
+    except sqlite3.OperationalError as e:
+        # The batches flushed before stay imported, e.g. when a password change kept the database locked too long.
+        errors.append(f'Import stopped, the database is busy: {str(e)}')
+        return imported_count, errors
     except Exception as e:
-        return 0, [f'Error processing CSV: {str(e)}']
+        errors.append(f'Error processing CSV: {str(e)}')
+        return imported_count, errors
     
     return imported_count, errors
\ No newline at end of file
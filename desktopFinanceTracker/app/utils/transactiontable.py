@@ -0,0 +1,94 @@
+import numpy as np
+from database.cache import parseOrdinal
+
+def idKeys(values):
+    return np.fromiter(values, dtype=np.int64, count=len(values))
+
+def ordinalKeys(values):
+    ordinals = {value: parseOrdinal(value) for value in set(values)}
+    return np.fromiter((ordinals[value] for value in values), dtype=np.int32, count=len(values))
+
+def amountKeys(values):
+    return np.fromiter(values, dtype=np.float64, count=len(values))
+
+def textKeys(values):
+    # Each value becomes the rank of its case-folded text, so values that differ only in case tie like they did
+    # under str.casefold sort keys.
+    folded = {value: str(value).casefold() for value in set(values)}
+    ranks = {text: rank for rank, text in enumerate(sorted(set(folded.values())))}
+    return np.fromiter((ranks[folded[value]] for value in values), dtype=np.int32, count=len(values))
+
+SORT_KEYS = {
+    0: idKeys,
+    1: ordinalKeys,
+    2: textKeys,
+    3: textKeys,
+    4: amountKeys,
+    5: textKeys,
+}
+
+class TransactionTable:
+    # Backing store of the transactions screen. Rows stay as the tuples shown in the table; each column also gets
+    # a typed sort key (ids, ordinal dates, float amounts, text ranks) and a stable argsort permutation per
+    # direction, built on the first sort by that column and reused until the rows change. A view is an array of
+    # row positions, so sorting and filtering never touch the row tuples themselves.
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.ids = idKeys([row[0] for row in self.rows])
+        self._keys = {}
+        self._orders = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def append(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        self.rows.extend(rows)
+        self.ids = np.concatenate([self.ids, idKeys([row[0] for row in rows])])
+        for column, keys in list(self._keys.items()):
+            if SORT_KEYS[column] is textKeys:
+                # New text can change the ranks of the existing values, so text keys are rebuilt on the next sort.
+                del self._keys[column]
+            else:
+                self._keys[column] = np.concatenate([keys, SORT_KEYS[column]([row[column] for row in rows])])
+        self._orders.clear()
+
+    def remove(self, ids):
+        keep = ~np.isin(self.ids, np.fromiter(ids, dtype=np.int64))
+        if keep.all():
+            return
+        self.rows = [row for row, kept in zip(self.rows, keep.tolist()) if kept]
+        self.ids = self.ids[keep]
+        self._keys = {column: keys[keep] for column, keys in self._keys.items()}
+        # A sorted order stays sorted when positions are dropped from it, so it is filtered and renumbered.
+        renumbered = np.cumsum(keep) - 1
+        self._orders = {key: renumbered[order[keep[order]]] for key, order in self._orders.items()}
+
+    def sortKeys(self, column):
+        keys = self._keys.get(column)
+        if keys is None:
+            keys = SORT_KEYS[column]([row[column] for row in self.rows])
+            self._keys[column] = keys
+        return keys
+
+    def order(self, column, reverse=False):
+        order = self._orders.get((column, reverse))
+        if order is None:
+            keys = self.sortKeys(column)
+            if reverse:
+                # Sorting the reversed keys and reading the result backwards gives a descending order in which
+                # equal keys keep their original order, like list.sort(reverse=True).
+                order = len(keys) - 1 - np.argsort(keys[::-1], kind="stable")[::-1]
+            else:
+                order = np.argsort(keys, kind="stable")
+            self._orders[(column, reverse)] = order
+        return order
+
+    def view(self, column=None, reverse=False, ids=None):
+        positions = np.arange(len(self.rows)) if column is None else self.order(column, reverse)
+        if ids is not None:
+            wanted = np.fromiter(ids, dtype=np.int64, count=len(ids))
+            positions = positions[np.isin(self.ids[positions], wanted)]
+        return positions
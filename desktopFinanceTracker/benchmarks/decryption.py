@@ -0,0 +1,55 @@
+# Measures how viewAllTransactions-style decryption scales with the worker pool.
+# Run from the desktopFinanceTracker directory:
+#     python -m benchmarks.decryption --rows 200000
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from database import db
+from database.decryption import DecryptionEngine
+from benchmarks.synthetic import createSyntheticDatabase
+
+def timeDecryption(engine, cipher, rows, user_id, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decrypted = engine.map(lambda chunk: db.decryptTransactions(cipher, chunk, user_id), rows)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(decrypted)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decryption scaling benchmark")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database", type=Path, default=None, help="Reuse a synthetic database instead of generating one")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.database or Path(tmp) / "benchmark.db"
+        if args.database and path.exists():
+            db.connections.usePath(path)
+            session = db.verifyLogin("benchmark", "benchmark")
+        else:
+            print(f"Generating {args.rows} synthetic transactions...")
+            session = createSyntheticDatabase(path, args.rows)
+
+        rows = db.connections.execute(f"{db.SELECT_TRANSACTIONS_QUERY} WHERE user_id = ?", (session.userId,)).fetchall()
+        cipher = session.requireCipher()
+
+        print(f"{'workers':>7} {'seconds':>9} {'rows/s':>11} {'speedup':>8}")
+        baseline = None
+        for workers in range(1, args.max_workers + 1):
+            engine = DecryptionEngine(workers=workers, parallelThreshold=0)
+            elapsed, count = timeDecryption(engine, cipher, rows, session.userId, args.repeat)
+            engine.shutdown()
+            baseline = baseline or elapsed
+            print(f"{workers:>7} {elapsed:>9.3f} {count / elapsed:>11,.0f} {baseline / elapsed:>7.2f}x")
+
+        session.close()
+        db.connections.closeAll()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# Times the data layer on synthetic encrypted databases and writes a JSON report.
+# Every measurement runs in its own process, so peak RSS belongs to that operation alone.
+# Run from the desktopFinanceTracker directory:
+#     python -m benchmarks.run --sizes 10000 100000 1000000 --output report.json
+#     python -m benchmarks.run --sizes 10000 --compare old.json
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from database import db
+from database.crypto import RowCipher
+from database.session import Session
+from benchmarks.synthetic import createSyntheticDatabase, syntheticTransactions
+
+USERNAME = "benchmark"
+PASSWORD = "benchmark"
+SINGLE_INSERTS = 1000
+BULK_INSERTS = 10000
+DELETE_IDS = 500
+SEARCH_QUERY = "12"
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def peakRssMB():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def openSession(cached):
+    # The uncached variant skips the cache load at login so the decrypt-everything paths are measured on their own.
+    if cached:
+        return db.verifyLogin(USERNAME, PASSWORD)
+    user_id, password_hash, salt, iterations = db.connections.execute("SELECT id, password_hash, salt, kdf_iterations FROM users WHERE username = ?", (USERNAME,)).fetchone()
+    key = db.checkCredentials(PASSWORD, password_hash, salt, iterations or db.LEGACY_KDF_ITERATIONS)
+    return Session(user_id, USERNAME, RowCipher(key))
+
+def middleMonth(session):
+    first, last = db.connections.execute("SELECT MIN(id), MAX(id) FROM transactions WHERE user_id = ?", (session.userId,)).fetchone()
+    row = db.connections.execute(f"{db.SELECT_TRANSACTIONS_QUERY} WHERE id >= ? LIMIT 1", ((first + last) // 2,)).fetchone()
+    date = db.decryptTransactions(session.cipher, [row], session.userId)[0][1]
+    _, month, year = date.split("-")
+    return int(month), int(year)
+
+def newTransactions(count):
+    # A different seed and start date keep the new rows from being rejected as duplicates.
+    return list(syntheticTransactions(count, seed=1, startDate=datetime.date(2040, 1, 1)))
+
+# Each operation gets a freshly opened session and returns (count of rows handled, callable to time).
+def login(session):
+    return 1, lambda: db.verifyLogin(USERNAME, PASSWORD)
+
+def insertTransaction(session):
+    rows = newTransactions(SINGLE_INSERTS)
+    def run():
+        for row in rows:
+            db.insertTransaction(row["date"], row["category"], row["description"], row["amount"], row["type"], session)
+    return len(rows), run
+
+def insertTransactions(session):
+    rows = newTransactions(BULK_INSERTS)
+    return len(rows), lambda: db.insertTransactions(rows, session)
+
+def viewAllTransactions(session):
+    count = db.connections.execute("SELECT COUNT(*) FROM transactions WHERE user_id = ?", (session.userId,)).fetchone()[0]
+    return count, lambda: db.viewAllTransactions(session)
+
+def viewTransactionsByMonth(session):
+    month, year = middleMonth(session)
+    count = len(db.viewTransactionsByMonth(month, year, session))
+    return count, lambda: db.viewTransactionsByMonth(month, year, session)
+
+def searchTransactionIds(session):
+    # The index is built by the first search of a session, so one search runs before the timed one.
+    db.searchTransactionIds(SEARCH_QUERY, session)
+    return len(session.cache), lambda: db.searchTransactionIds(SEARCH_QUERY, session)
+
+def deleteTransactionsByID(session):
+    ids = [row[0] for row in db.connections.execute("SELECT id FROM transactions WHERE user_id = ? ORDER BY RANDOM() LIMIT ?", (session.userId, DELETE_IDS))]
+    return len(ids), lambda: db.deleteTransactionsByID(session, ids)
+
+def clearAllTransactions(session):
+    count = db.connections.execute("SELECT COUNT(*) FROM transactions WHERE user_id = ?", (session.userId,)).fetchone()[0]
+    return count, lambda: db.clearAllTransactions(session)
+
+def backupDB(session):
+    count = db.connections.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    return count, lambda: db.backupDB(force=True)
+
+# name: (function, cached session, modifies the database)
+OPERATIONS = {
+    "login": (login, False, False),
+    "insertTransaction": (insertTransaction, True, True),
+    "insertTransactions": (insertTransactions, True, True),
+    "viewAllTransactions": (viewAllTransactions, True, False),
+    "viewAllTransactions:uncached": (viewAllTransactions, False, False),
+    "viewTransactionsByMonth": (viewTransactionsByMonth, True, False),
+    "viewTransactionsByMonth:uncached": (viewTransactionsByMonth, False, False),
+    "searchTransactionIds": (searchTransactionIds, True, False),
+    "deleteTransactionsByID": (deleteTransactionsByID, True, True),
+    "clearAllTransactions": (clearAllTransactions, True, True),
+    "backupDB": (backupDB, False, False),
+}
+
+def measure(operation, path, backup_dir):
+    # Runs inside the child process and prints one JSON result.
+    function, cached, _ = OPERATIONS[operation]
+    db.connections.usePath(path)
+    db.backups.directory = backup_dir
+    session = openSession(cached)
+    count, run = function(session)
+    setup_rss = peakRssMB()
+
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "operation": operation,
+        "count": count,
+        "seconds": seconds,
+        "rowsPerSecond": count / seconds if seconds else None,
+        "setupRssMB": setup_rss,
+        "peakRssMB": peakRssMB(),
+    }))
+    session.close()
+    db.connections.closeAll()
+
+def syntheticDatabase(rows, cache_dir):
+    path = cache_dir / f"synthetic-{rows}.db"
+    if not path.exists():
+        print(f"Generating {rows} synthetic transactions...", file=sys.stderr)
+        partial = path.with_suffix(".partial")
+        for leftover in partial.parent.glob(partial.name + "*"):
+            leftover.unlink()
+        session = createSyntheticDatabase(partial, rows, USERNAME, PASSWORD)
+        session.close()
+        db.connections.closeAll()
+        partial.rename(path)
+    return path
+
+def runChild(operation, path, backup_dir):
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--measure", operation, "--database", str(path), "--backup-dir", str(backup_dir)],
+        capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{operation} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def gitCommit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline_path):
+    baseline = json.loads(Path(baseline_path).read_text())
+    previous = {(result["rows"], result["operation"]): result for result in baseline["results"]}
+    print(f"\n{'rows':>9} {'operation':<34} {'before s':>9} {'after s':>9} {'change':>8}")
+    for result in report["results"]:
+        before = previous.get((result["rows"], result["operation"]))
+        if before is None:
+            continue
+        change = (result["seconds"] - before["seconds"]) / before["seconds"] * 100 if before["seconds"] else 0
+        print(f"{result['rows']:>9} {result['operation']:<34} {before['seconds']:>9.3f} {result['seconds']:>9.3f} {change:>+7.1f}%")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Data layer benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--operations", nargs="+", choices=list(OPERATIONS), default=list(OPERATIONS))
+    parser.add_argument("--output", type=Path, default=Path("benchmark-report.json"))
+    parser.add_argument("--compare", type=Path, default=None, help="Print the change against an earlier report")
+    parser.add_argument("--cache-dir", type=Path, default=None, help="Keep generated databases here between runs")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    parser.add_argument("--database", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--backup-dir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        measure(args.measure, args.database, args.backup_dir)
+        return
+
+    report = {
+        "commit": gitCommit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        cache_dir = args.cache_dir or tmp
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        print(f"{'rows':>9} {'operation':<34} {'count':>9} {'seconds':>9} {'rows/s':>12} {'peak MB':>8}")
+        for rows in args.sizes:
+            source = syntheticDatabase(rows, cache_dir)
+            for operation in args.operations:
+                path = source
+                if OPERATIONS[operation][2]:
+                    # Operations that write get their own copy, so every one of them starts from the same data.
+                    path = tmp / f"work-{rows}.db"
+                    shutil.copyfile(source, path)
+                result = runChild(operation, path, tmp / "backups")
+                result["rows"] = rows
+                report["results"].append(result)
+                rate = f"{result['rowsPerSecond']:,.0f}" if result["rowsPerSecond"] else "-"
+                peak = f"{result['peakRssMB']:.0f}" if result["peakRssMB"] is not None else "-"
+                print(f"{rows:>9} {operation:<34} {result['count']:>9} {result['seconds']:>9.3f} {rate:>12} {peak:>8}")
+                if path != source:
+                    for work_file in tmp.glob(f"work-{rows}.db*"):
+                        work_file.unlink()
+
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"\nReport written to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import datetime
+import random
+from database import db
+
+CATEGORIES = {
+    "Bills": ["Rent", "Electricity bill", "Internet", "Water bill", "Phone bill"],
+    "Shopping": ["Groceries", "Clothes", "Electronics", "Household"],
+    "Transport": ["Train", "Bus", "Fuel", "Taxi"],
+    "Health": ["Medication", "Dentist", "Gym"],
+    "Leisure": ["Restaurant", "Cinema", "Concert", "Books"],
+}
+INCOME_CATEGORIES = {
+    "Salary": ["Employer paycheck"],
+    "Freelance": ["Project"],
+    "Investment": ["Dividend payout"],
+}
+
+def syntheticTransactions(count, seed=0, startDate=datetime.date(2010, 1, 1), perDay=8):
+    generator = random.Random(seed)
+    for index in range(count):
+        date = startDate + datetime.timedelta(days=index // perDay)
+        if generator.random() < 0.1:
+            category = generator.choice(list(INCOME_CATEGORIES))
+            description = generator.choice(INCOME_CATEGORIES[category])
+            amount = round(generator.uniform(100, 4000), 2)
+            type_ = "income"
+        else:
+            category = generator.choice(list(CATEGORIES))
+            description = generator.choice(CATEGORIES[category])
+            amount = round(generator.uniform(1, 600), 2)
+            type_ = "expense"
+        yield {
+            "date": date.strftime("%d-%m-%Y"),
+            "category": category,
+            "description": description,
+            "amount": amount,
+            "type": type_,
+        }
+
+def createSyntheticDatabase(path, rows, username="benchmark", password="benchmark", seed=0, batchSize=5000):
+    db.connections.usePath(path)
+    db.initDB()
+    db.insertUser(username, password)
+    session = db.verifyLogin(username, password)
+    if session is None:
+        raise RuntimeError("Could not log in to the synthetic database")
+
+    batch = []
+    for transaction in syntheticTransactions(rows, seed=seed):
+        batch.append(transaction)
+        if len(batch) >= batchSize:
+            db.insertTransactions(batch, session)
+            batch = []
+    if batch:
+        db.insertTransactions(batch, session)
+
+    return session
@@ -0,0 +1,129 @@
+import datetime
+import gzip
+import json
+import os
+import sqlite3
+import threading
+
+BACKUP_PREFIX = "backup_finance-"
+BACKUP_SUFFIX = ".db.gz"
+MANIFEST_NAME = "backups.json"
+PAGES_PER_STEP = 256
+STEP_SLEEP_SECONDS = 0.005
+COMPRESS_CHUNK_SIZE = 1024 * 1024
+
+class BackupEngine:
+    # Copies the live database a few pages at a time with the SQLite online backup API, so writers on
+    # other threads are only held up for one step at a time. Each snapshot is gzip-compressed and only
+    # the newest `keep` snapshots are kept. A snapshot is skipped when the change counter has not moved since
+    # the previous one; ConnectionManager.transaction bumps it once per committed write transaction that changed rows.
+    def __init__(self, connections, directory, keep=5, pagesPerStep=PAGES_PER_STEP):
+        self.connections = connections
+        self.directory = directory
+        self.keep = keep
+        self.pagesPerStep = pagesPerStep
+        self._lock = threading.Lock()
+
+    def changeCounter(self):
+        result = self.connections.execute("SELECT value FROM db_meta WHERE key = 'change_counter'").fetchone()
+        return result[0] if result else None
+
+    def _readManifest(self):
+        try:
+            with open(self.directory / MANIFEST_NAME, encoding="utf-8") as manifest:
+                return json.load(manifest)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _writeManifest(self, manifest):
+        path = self.directory / MANIFEST_NAME
+        with open(path.with_suffix(".partial"), "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+        os.replace(path.with_suffix(".partial"), path)
+
+    def snapshots(self):
+        if not self.directory.exists():
+            return []
+        return sorted(path for path in self.directory.iterdir() if path.name.startswith(BACKUP_PREFIX) and path.name.endswith(BACKUP_SUFFIX))
+
+    def latestSnapshot(self):
+        snapshots = self.snapshots()
+        return snapshots[-1] if snapshots else None
+
+    def needsBackup(self):
+        counter = self.changeCounter()
+        manifest = self._readManifest()
+        latest = self.latestSnapshot()
+        return counter is None or latest is None or manifest.get("changeCounter") != counter or manifest.get("snapshot") != latest.name
+
+    def run(self, progress=None, force=False):
+        # progress(phase, done, total) is called from the backup thread with phase "copy" or "compress".
+        with self._lock:
+            if not force and not self.needsBackup():
+                return None
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            counter = self.changeCounter()
+            timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+            target = self.directory / f"{BACKUP_PREFIX}{timestamp}{BACKUP_SUFFIX}"
+            copy_path = self.directory / f"{BACKUP_PREFIX}{timestamp}.db.partial"
+            compressed_path = self.directory / f"{BACKUP_PREFIX}{timestamp}.gz.partial"
+
+            try:
+                self._copy(copy_path, progress)
+                self._compress(copy_path, compressed_path, progress)
+                os.replace(compressed_path, target)
+            finally:
+                for leftover in (copy_path, compressed_path):
+                    if leftover.exists():
+                        leftover.unlink()
+
+            self._writeManifest({"changeCounter": counter, "snapshot": target.name})
+            self._rotate()
+            return target
+
+    def _copy(self, copy_path, progress):
+        def onStep(status, remaining, total):
+            if progress:
+                progress("copy", total - remaining, total)
+
+        backup_connection = sqlite3.connect(copy_path)
+        try:
+            self.connections.connection().backup(backup_connection, pages=self.pagesPerStep, progress=onStep, sleep=STEP_SLEEP_SECONDS)
+        finally:
+            backup_connection.close()
+
+    def _compress(self, copy_path, compressed_path, progress):
+        total = copy_path.stat().st_size
+        done = 0
+        with open(copy_path, "rb") as source, gzip.open(compressed_path, "wb", compresslevel=6) as target:
+            while True:
+                chunk = source.read(COMPRESS_CHUNK_SIZE)
+                if not chunk:
+                    break
+                target.write(chunk)
+                done += len(chunk)
+                if progress:
+                    progress("compress", done, total)
+
+    def _rotate(self):
+        snapshots = self.snapshots()
+        for snapshot in snapshots[:max(0, len(snapshots) - self.keep)]:
+            snapshot.unlink()
+
+    def start(self, progress=None, onComplete=None, force=False):
+        # onComplete(path, error) runs on the backup thread; path is None when nothing changed.
+        def run():
+            path, error = None, None
+            try:
+                path = self.run(progress, force)
+            except Exception as e:
+                error = e
+            finally:
+                self.connections.closeThreadConnection()
+            if onComplete:
+                onComplete(path, error)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
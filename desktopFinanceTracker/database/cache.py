@@ -0,0 +1,216 @@
+import datetime
+import threading
+import numpy as np
+from database.search import MAX_GRAM, NgramIndex
+
+def parseOrdinal(date):
+    # Dates are stored as DD-MM-YYYY; 0 marks a date that cannot be parsed.
+    try:
+        day, month, year = str(date).strip().split("-")
+        return datetime.date(int(year), int(month), int(day)).toordinal()
+    except ValueError:
+        return 0
+
+class Vocabulary:
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+        self.lowered = []
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def array(self):
+        values = np.empty(len(self.values), dtype=object)
+        values[:] = self.values
+        return values
+
+    def matching(self, query):
+        # Codes of the values whose text contains the query, compared the way the table shows them.
+        lowered = self.lowered
+        if len(lowered) < len(self.values):
+            lowered.extend(str(value).lower() for value in self.values[len(lowered):])
+        return np.fromiter((code for code, value in enumerate(lowered) if query in value), dtype=np.int64)
+
+class TransactionCache:
+    # Decrypted copy of one user's transactions held as NumPy columns. It is filled once after login and
+    # then kept in step by the write functions in db.py, so reads never go back to SQLite and decryption.
+    # Arrays are replaced rather than resized in place, so a reader holding a reference never sees a torn update.
+    def __init__(self, user_id):
+        self.userId = user_id
+        self._lock = threading.RLock()
+        self._ordinalCache = {}
+        self.categories = Vocabulary()
+        self.descriptions = Vocabulary()
+        self.types = Vocabulary()
+        self.dateStrings = Vocabulary()
+        self.version = 0
+        self._reset()
+
+    def _reset(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.ordinals = np.empty(0, dtype=np.int32)
+        self.amounts = np.empty(0, dtype=np.float64)
+        self.typeCodes = np.empty(0, dtype=np.int8)
+        self.categoryCodes = np.empty(0, dtype=np.int32)
+        self.descriptionCodes = np.empty(0, dtype=np.int32)
+        self.dateCodes = np.empty(0, dtype=np.int32)
+        self._searchIndex = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _ordinal(self, date):
+        ordinal = self._ordinalCache.get(date)
+        if ordinal is None:
+            ordinal = parseOrdinal(date)
+            self._ordinalCache[date] = ordinal
+        return ordinal
+
+    def _columns(self, rows):
+        return (
+            np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter((self._ordinal(row[1]) for row in rows), dtype=np.int32, count=len(rows)),
+            np.fromiter((row[4] for row in rows), dtype=np.float64, count=len(rows)),
+            np.fromiter((self.types.encode(row[5]) for row in rows), dtype=np.int8, count=len(rows)),
+            np.fromiter((self.categories.encode(row[2]) for row in rows), dtype=np.int32, count=len(rows)),
+            np.fromiter((self.descriptions.encode(row[3]) for row in rows), dtype=np.int32, count=len(rows)),
+            np.fromiter((self.dateStrings.encode(row[1]) for row in rows), dtype=np.int32, count=len(rows)),
+        )
+
+    def load(self, rows):
+        with self._lock:
+            self._reset()
+            self.append(rows)
+
+    def append(self, rows):
+        if not rows:
+            return
+        with self._lock:
+            ids, ordinals, amounts, typeCodes, categoryCodes, descriptionCodes, dateCodes = self._columns(rows)
+            self.ids = np.concatenate([self.ids, ids])
+            self.ordinals = np.concatenate([self.ordinals, ordinals])
+            self.amounts = np.concatenate([self.amounts, amounts])
+            self.typeCodes = np.concatenate([self.typeCodes, typeCodes])
+            self.categoryCodes = np.concatenate([self.categoryCodes, categoryCodes])
+            self.descriptionCodes = np.concatenate([self.descriptionCodes, descriptionCodes])
+            self.dateCodes = np.concatenate([self.dateCodes, dateCodes])
+            if self._searchIndex is not None:
+                self._searchIndex.add(ids.tolist(), self._searchTexts(ids, amounts))
+            self.version += 1
+
+    def remove(self, ids):
+        with self._lock:
+            keep = ~np.isin(self.ids, np.fromiter(ids, dtype=np.int64))
+            if keep.all():
+                return
+            if self._searchIndex is not None:
+                self._searchIndex.remove(self.ids[~keep].tolist(), self._searchTexts(self.ids[~keep], self.amounts[~keep]))
+            self.ids = self.ids[keep]
+            self.ordinals = self.ordinals[keep]
+            self.amounts = self.amounts[keep]
+            self.typeCodes = self.typeCodes[keep]
+            self.categoryCodes = self.categoryCodes[keep]
+            self.descriptionCodes = self.descriptionCodes[keep]
+            self.dateCodes = self.dateCodes[keep]
+            self.version += 1
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+            self.version += 1
+
+    def _columnsSnapshot(self):
+        return (self.ids, self.dateCodes, self.categoryCodes, self.descriptionCodes, self.amounts, self.typeCodes)
+
+    def _materialize(self, columns):
+        ids, dateCodes, categoryCodes, descriptionCodes, amounts, typeCodes = columns
+        dates = self.dateStrings.values
+        categories = self.categories.values
+        descriptions = self.descriptions.values
+        types = self.types.values
+        return [
+            (transaction_id, dates[date], categories[category], descriptions[description], amount, types[type_])
+            for transaction_id, date, category, description, amount, type_
+            in zip(ids.tolist(), dateCodes.tolist(), categoryCodes.tolist(), descriptionCodes.tolist(), amounts.tolist(), typeCodes.tolist())
+        ]
+
+    def _mask(self, startOrdinal=None, endOrdinal=None, typeName=None):
+        # endOrdinal is exclusive. Any date bound excludes rows whose date could not be parsed.
+        mask = np.ones(len(self.ids), dtype=bool)
+        if startOrdinal is not None:
+            mask &= self.ordinals >= startOrdinal
+        if endOrdinal is not None:
+            mask &= (self.ordinals < endOrdinal) & (self.ordinals > 0)
+        if typeName is not None:
+            mask &= self.typeCodes == self.types.codes.get(typeName, -1)
+        return mask
+
+    def rows(self, mask=None):
+        with self._lock:
+            columns = self._columnsSnapshot()
+            if mask is not None:
+                columns = tuple(column[mask] for column in columns)
+            return self._materialize(columns)
+
+    def columns(self, startOrdinal=None, endOrdinal=None, typeName=None):
+        # The selected rows as typed arrays for vectorized consumers such as the charts. Text columns stay as
+        # vocabulary codes; the matching values arrays decode them.
+        with self._lock:
+            mask = self._mask(startOrdinal, endOrdinal, typeName)
+            return {
+                "ids": self.ids[mask],
+                "ordinals": self.ordinals[mask],
+                "amounts": self.amounts[mask],
+                "typeCodes": self.typeCodes[mask],
+                "categoryCodes": self.categoryCodes[mask],
+                "descriptionCodes": self.descriptionCodes[mask],
+                "types": self.types.array(),
+                "categories": self.categories.array(),
+                "descriptions": self.descriptions.array(),
+            }
+
+    def rowsBetween(self, startOrdinal, endOrdinal):
+        with self._lock:
+            return self.rows(self._mask(startOrdinal, endOrdinal))
+
+    def iterRows(self, startOrdinal=None, endOrdinal=None, typeName=None, pageSize=5000):
+        # The column arrays are never modified in place, so the references taken here stay a consistent
+        # snapshot even if transactions are added or removed while the caller is still paging.
+        with self._lock:
+            columns = self._columnsSnapshot()
+            positions = np.flatnonzero(self._mask(startOrdinal, endOrdinal, typeName))
+        for start in range(0, len(positions), pageSize):
+            page = positions[start:start + pageSize]
+            yield from self._materialize(tuple(column[page] for column in columns))
+
+    def _searchTexts(self, ids, amounts):
+        return [f"{transaction_id}\0{amount}" for transaction_id, amount in zip(ids.tolist(), amounts.tolist())]
+
+    def searchIds(self, query):
+        # Ids of the rows where the lowercased query occurs in the text of any cell. Dates, categories,
+        # descriptions and types are matched through their vocabularies, which hold far fewer values than there
+        # are rows; ids and amounts go through an n-gram index built on the first search of the session.
+        query = query.lower()
+        with self._lock:
+            if self._searchIndex is None:
+                self._searchIndex = NgramIndex()
+                self._searchIndex.add(self.ids.tolist(), self._searchTexts(self.ids, self.amounts))
+            mask = np.isin(self.dateCodes, self.dateStrings.matching(query))
+            mask |= np.isin(self.categoryCodes, self.categories.matching(query))
+            mask |= np.isin(self.descriptionCodes, self.descriptions.matching(query))
+            mask |= np.isin(self.typeCodes, self.types.matching(query))
+
+            candidates = self._searchIndex.candidates(query)
+            if len(candidates):
+                positions = np.flatnonzero(np.isin(self.ids, candidates) & ~mask)
+                if len(query) > MAX_GRAM:
+                    texts = self._searchTexts(self.ids[positions], self.amounts[positions])
+                    positions = positions[[query in text for text in texts]]
+                mask[positions] = True
+            return self.ids[mask]
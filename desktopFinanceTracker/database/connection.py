@@ -0,0 +1,116 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=134217728",
+)
+
+BUSY_TIMEOUT_SECONDS = 10
+STATEMENT_CACHE_SIZE = 256
+CHANGE_COUNTER_QUERY = "UPDATE db_meta SET value = value + 1 WHERE key = 'change_counter'"
+
+class ConnectionManager:
+    # One long-lived connection per thread. WAL lets the Tk thread keep reading while a worker thread
+    # (imports, predictions) writes, and busy_timeout makes concurrent writers wait instead of failing.
+    # Connections are never shared between threads; check_same_thread is off only so that connections
+    # left behind by finished threads can be closed from whichever thread notices them.
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}
+        self._generation = 0
+
+    def connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.generation != self._generation:
+            connection = self._open()
+            self._local.connection = connection
+            self._local.generation = self._generation
+            self._local.hasChangeCounter = False
+        return connection
+
+    def _open(self):
+        self.path.parent.mkdir(exist_ok=True)
+        connection = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        for pragma in PRAGMAS:
+            connection.execute(pragma)
+
+        with self._lock:
+            self._pruneDeadThreads()
+            self._connections[threading.get_ident()] = (threading.current_thread(), connection)
+        return connection
+
+    def _pruneDeadThreads(self):
+        for ident, (thread, connection) in list(self._connections.items()):
+            if not thread.is_alive():
+                connection.close()
+                del self._connections[ident]
+
+    @contextmanager
+    def transaction(self, immediate=True, onRollback=None):
+        # onRollback runs before a failed transaction is rolled back, i.e. while the write lock is still held.
+        connection = self.connection()
+        if connection.in_transaction:
+            # Nested use joins the outer transaction so helpers can be composed.
+            yield connection.cursor()
+            return
+
+        connection.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        changes = connection.total_changes
+        try:
+            yield connection.cursor()
+            if connection.total_changes != changes:
+                self._countChange(connection)
+            connection.commit()
+        except BaseException:
+            if onRollback is not None:
+                onRollback()
+            connection.rollback()
+            raise
+
+    def _countChange(self, connection):
+        # Bumps the change counter that backups compare against once per committed write transaction.
+        # db_meta is created by a migration, so databases that have not been migrated yet are skipped.
+        if not self._local.hasChangeCounter:
+            if not connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'db_meta'").fetchone():
+                return
+            self._local.hasChangeCounter = True
+        connection.execute(CHANGE_COUNTER_QUERY)
+
+    def execute(self, query, params=()):
+        return self.connection().execute(query, params)
+
+    def closeThreadConnection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            return
+        with self._lock:
+            self._connections.pop(threading.get_ident(), None)
+        connection.close()
+        self._local.connection = None
+
+    def closeAll(self):
+        with self._lock:
+            for _, connection in self._connections.values():
+                connection.close()
+            self._connections.clear()
+            self._generation += 1
+        self._local.connection = None
+
+    def usePath(self, path):
+        # Points every thread at another database file, e.g. a synthetic one for benchmarks.
+        self.closeAll()
+        self.path = path
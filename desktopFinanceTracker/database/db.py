@@ -3,21 +3,138 @@
 import sqlite3
 import datetime
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from app.config import DB_PATH, DB_BACKUP_PATH
+from typing import NamedTuple
+from app.config import DB_PATH, DB_BACKUP_DIR, BACKUP_KEEP, KDF_ITERATIONS
+from database.connection import ConnectionManager
+from database.crypto import RowCipher, monthKey
+from database.decryption import DecryptionEngine
+from database.cache import TransactionCache, parseOrdinal
+from database.backup import BackupEngine
+from database.maintenance import IncrementalVacuum
+from database.session import Session
+from database.events import TransactionsInserted, TransactionsDeleted, TransactionsCleared
+from app.tracing import traced
 import bcrypt
-from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 
-encryption_key = None
+login_timings = {}
+connections = ConnectionManager(DB_PATH)
+decryption = DecryptionEngine()
+backups = BackupEngine(connections, DB_BACKUP_DIR, keep=BACKUP_KEEP)
+vacuum = IncrementalVacuum(connections)
 
+ROW_MIGRATION_BATCH_SIZE = 500
+ROW_MIGRATION_PAUSE_SECONDS = 0.05
+# Accounts created before the iteration count was stored per user were derived with this count.
+LEGACY_KDF_ITERATIONS = 100000
+
+def addFingerprintColumn(db_cursor):
+    db_cursor.execute("ALTER TABLE transactions ADD COLUMN fingerprint TEXT")
+    db_cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_fingerprint ON transactions(fingerprint)")
+
+def addMonthTokenColumn(db_cursor):
+    db_cursor.execute("ALTER TABLE transactions ADD COLUMN month_token TEXT")
+    db_cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user_month ON transactions(user_id, month_token)")
+
+def addPayloadColumn(db_cursor):
+    db_cursor.execute("ALTER TABLE transactions ADD COLUMN payload BLOB")
+
+def addKdfIterationsColumn(db_cursor):
+    db_cursor.execute("ALTER TABLE users ADD COLUMN kdf_iterations INTEGER")
+
+def addChangeCounter(db_cursor):
+    # Counts committed write transactions so that backups can tell whether anything happened since the last snapshot.
+    # ConnectionManager.transaction bumps it.
+    db_cursor.execute("CREATE TABLE IF NOT EXISTS db_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    db_cursor.execute("INSERT OR IGNORE INTO db_meta (key, value) VALUES ('change_counter', 0)")
+
+def enableIncrementalVacuum(connection):
+    # auto_vacuum only changes on an existing file through a full VACUUM, which cannot run inside a transaction.
+    # This is the last full VACUUM; afterwards purges free pages through the incremental vacuum worker.
+    connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    connection.execute("VACUUM")
+enableIncrementalVacuum.transactional = False
+
+def addMonthlyRollupsTable(db_cursor):
+    db_cursor.execute('''
+        CREATE TABLE IF NOT EXISTS monthly_rollups (
+            user_id INTEGER NOT NULL,
+            month_token TEXT NOT NULL,
+            category_token TEXT NOT NULL,
+            type TEXT NOT NULL,
+            payload BLOB NOT NULL,
+            PRIMARY KEY (user_id, month_token, category_token, type)
+        ) WITHOUT ROWID
+    ''')
+
+def addRekeyTables(db_cursor):
+    # Checkpoint and staging area for database/rekey.py, so that an interrupted password change can resume.
+    # Staged copies must not outlive their rows: clearAllTransactions and deleteTransactionsByID delete them too.
+    db_cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rekey_state (
+            user_id INTEGER PRIMARY KEY,
+            password_hash BLOB NOT NULL,
+            salt BLOB NOT NULL,
+            kdf_iterations INTEGER NOT NULL,
+            last_id INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    db_cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rekey_rows (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            fingerprint TEXT,
+            month_token TEXT,
+            payload BLOB NOT NULL
+        )
+    ''')
+    db_cursor.execute("CREATE INDEX IF NOT EXISTS idx_rekey_rows_user_id ON rekey_rows(user_id)")
+
+def dropChangeCounterTriggers(db_cursor):
+    # The counter used to be bumped by FOR EACH ROW triggers, which ran an extra UPDATE for every row written.
+    for table in ("transactions", "users"):
+        for event in ("insert", "update", "delete"):
+            db_cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{event}_counter")
+
+def addDuplicateColumn(db_cursor):
+    # Set by backfillBlindIndexes on legacy rows that duplicate a fingerprinted row, so later logins skip them.
+    db_cursor.execute("ALTER TABLE transactions ADD COLUMN duplicate INTEGER NOT NULL DEFAULT 0")
+
+# Schema changes are applied in order and tracked with PRAGMA user_version. Append new migrations to the end.
+MIGRATIONS = [
+    addFingerprintColumn,
+    addMonthTokenColumn,
+    addPayloadColumn,
+    addKdfIterationsColumn,
+    addChangeCounter,
+    enableIncrementalVacuum,
+    addMonthlyRollupsTable,
+    addRekeyTables,
+    dropChangeCounterTriggers,
+    addDuplicateColumn,
+]
+
+def migrateDB():
+    version = connections.execute("PRAGMA user_version").fetchone()[0]
+    for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        if not getattr(migration, "transactional", True):
+            migration(connections.connection())
+            connections.execute(f"PRAGMA user_version = {target}")
+            continue
+        with connections.transaction() as db_cursor:
+            migration(db_cursor)
+            db_cursor.execute(f"PRAGMA user_version = {target}")
+
+@traced("db")
 def initDB():
     DB_PATH.parent.mkdir(exist_ok=True)
-    connect_to_database = sqlite3.connect(DB_PATH)
-    db_cursor = connect_to_database.cursor()
-    db_cursor.executescript('''
+    connections.connection().executescript('''
         CREATE TABLE IF NOT EXISTS transactions (
             id INTEGER PRIMARY KEY,
             date TEXT,
@@ -36,198 +153,608 @@ def initDB():
             username TEXT UNIQUE NOT NULL,
             password_hash BLOB NOT NULL,
             salt BLOB NOT NULL
-        )
+        );
     ''')
-    connect_to_database.commit()
-    connect_to_database.close()
+    migrateDB()
 
 def hashPassword(password: str) -> bytes:
     return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
 
-def deriveKey(password: str, salt: bytes = None) -> bytes:
+def deriveKey(password: str, salt: bytes = None, iterations: int = LEGACY_KDF_ITERATIONS) -> bytes:
     if salt is None:
         salt = os.urandom(16)
-    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=100000, backend=None)
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=iterations, backend=None)
     key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
     return key, salt
 
-def setEncryptionKey(key: bytes):
-    global encryption_key
-    encryption_key = key
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def calibrateKdfIterations(target_seconds=0.5, sample_iterations=20000):
+    _, elapsed = timed(deriveKey, "calibration", os.urandom(16), sample_iterations)
+    return max(LEGACY_KDF_ITERATIONS, int(sample_iterations * target_seconds / elapsed))
 
-def clearEncryptionKey():
-    global encryption_key
-    encryption_key = None
+def checkCredentials(password, password_hash, salt, iterations):
+    # bcrypt and PBKDF2 both release the GIL, so the key is derived while the password hash is checked.
+    # The key is discarded unless the check succeeds.
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="login") as pool:
+        check = pool.submit(timed, bcrypt.checkpw, password.encode(), password_hash)
+        derive = pool.submit(timed, deriveKey, password, salt, iterations)
+        valid, bcrypt_seconds = check.result()
+        (key, _), pbkdf2_seconds = derive.result()
+    login_timings.update(bcrypt=bcrypt_seconds, pbkdf2=pbkdf2_seconds, iterations=iterations)
+    return key if valid else None
 
+@traced("db")
 def verifyLogin(username, password):
-    connect_to_database = sqlite3.connect(DB_PATH)
-    db_cursor = connect_to_database.cursor()
-    db_cursor.execute("SELECT password_hash, salt FROM users WHERE username = ?", (username,))
-    result = db_cursor.fetchone()
-    connect_to_database.close()
+    # Slow by design (bcrypt, PBKDF2, the index backfill and the cache load), so the UI calls it from a worker thread.
+    # Returns the new Session, or None if the credentials are wrong.
+    start = time.perf_counter()
+    login_timings.clear()
+    result = connections.execute("SELECT id, password_hash, salt, kdf_iterations FROM users WHERE username = ?", (username,)).fetchone()
     if result:
-        password_hash, salt = result
-        if bcrypt.checkpw(password.encode(), password_hash):
-            key, _ = deriveKey(password, salt)
-            setEncryptionKey(key)
-            return True
+        user_id, password_hash, salt, iterations = result
+        key = checkCredentials(password, password_hash, salt, iterations or LEGACY_KDF_ITERATIONS)
+        credentials_checked = time.perf_counter()
+        if key is not None:
+            session = Session(user_id, username, RowCipher(key))
+            backfillBlindIndexes(session)
+            loadTransactionCache(session)
+            ensureMonthlyRollups(session)
+            startRowFormatMigration(session)
+            login_timings.update(credentials=credentials_checked - start, session=time.perf_counter() - credentials_checked, total=time.perf_counter() - start)
+            return session
 
-    clearEncryptionKey()
-    return False
+    login_timings.update(total=time.perf_counter() - start)
+    return None
 
+@traced("db")
 def insertUser(username, password):
     try:
-        connect_to_database = sqlite3.connect(DB_PATH)
-        db_cursor = connect_to_database.cursor()
-        password_hash = hashPassword(password)
-        key, salt = deriveKey(password)
-        db_cursor.execute('INSERT INTO users (username, password_hash, salt) VALUES (?, ?, ?)', (username, password_hash, salt))
-        connect_to_database.commit()
-        connect_to_database.close()
+        login_timings.clear()
+        password_hash, login_timings['bcrypt'] = timed(hashPassword, password)
+        # Only the salt is stored; the key itself is derived again at every login.
+        salt = os.urandom(16)
+        with connections.transaction() as db_cursor:
+            db_cursor.execute('INSERT INTO users (username, password_hash, salt, kdf_iterations) VALUES (?, ?, ?, ?)', (username, password_hash, salt, KDF_ITERATIONS))
         return True, None
-    except sqlite3.IntegrityError():
-        connect_to_database.close()
+    except sqlite3.IntegrityError:
         return False, "Username already exists!"
     except Exception as e:
-        connect_to_database.close()
         return False, f"Registration failed: {str(e)}"
 
-def getUserID(username):
-    connect_to_database = sqlite3.connect(DB_PATH)
-    db_cursor = connect_to_database.cursor()
-    db_cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-    result = db_cursor.fetchone()
-    connect_to_database.close()
-    return result[0] if result else None
-
-def deleteUser(username, password):
+@traced("db")
+def deleteUser(session, password):
     try:
-        connect_to_database = sqlite3.connect(DB_PATH)
-        db_cursor = connect_to_database.cursor()
-        db_cursor.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,))
-        result = db_cursor.fetchone()
+        user_id = session.userId
+        result = connections.execute("SELECT password_hash FROM users WHERE id = ?", (user_id,)).fetchone()
         if not result:
-            connect_to_database.close()
             return False, "User not found!"
-        user_id, stored_hash = result
+        stored_hash = result[0]
         if not bcrypt.checkpw(password.encode(), stored_hash):
-            connect_to_database.close()
             return False, "Incorrect password!"
 
-        db_cursor.execute("DELETE FROM transactions WHERE user_id = ?", (user_id,))
-        db_cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        with connections.transaction() as db_cursor:
+            db_cursor.execute("DELETE FROM transactions WHERE user_id = ?", (user_id,))
+            db_cursor.execute("DELETE FROM monthly_rollups WHERE user_id = ?", (user_id,))
+            db_cursor.execute("DELETE FROM rekey_rows WHERE user_id = ?", (user_id,))
+            db_cursor.execute("DELETE FROM rekey_state WHERE user_id = ?", (user_id,))
+            db_cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        vacuum.schedule()
+        session.close()
 
-        connect_to_database.commit()
-        connect_to_database.close()
         return True, "User and associated data deleted successfully!"
     except sqlite3.DatabaseError as e:
-        connect_to_database.close()
         return False, f"Database error: {str(e)}"
     except Exception as e:
-        connect_to_database.close()
         return False, f"Deletion failed: {str(e)}"
 
-def insertTransaction(date, category, description, amount, type_, user_id):
-    global encryption_key
-    if encryption_key is None:
-        raise ValueError("Encryption key is not set. Please log in.")
-    fernet = Fernet(encryption_key)
-    encrypted_date = fernet.encrypt(date.encode()).decode()
-    encrypted_category = fernet.encrypt(category.encode()).decode()
-    encrypted_description = fernet.encrypt(description.encode()).decode()
-    encrypted_amount = fernet.encrypt(str(amount).encode()).decode()
-    connect_to_database = sqlite3.connect(DB_PATH)
-    db_cursor = connect_to_database.cursor()
+TRANSACTION_CREATED = "created"
+TRANSACTION_DUPLICATE = "duplicate"
+TRANSACTION_ERROR = "error"
 
-    db_cursor.execute('''
-        SELECT id FROM transactions
-        WHERE description = ? AND date = ? AND amount = ?
-        AND user_id = ?
-    ''', (encrypted_description, encrypted_date, encrypted_amount, user_id))
+INSERT_TRANSACTION_QUERY = '''
+    INSERT INTO transactions (type, user_id, fingerprint, month_token, payload)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(fingerprint) DO NOTHING
+'''
 
-    if db_cursor.fetchone():
-        connect_to_database.close()
-        return None, False
+SELECT_TRANSACTIONS_QUERY = 'SELECT id, date, category, description, amount, type, payload FROM transactions'
 
-    db_cursor.execute('''
-        INSERT INTO transactions (date, category, description, amount, type, user_id)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (encrypted_date, encrypted_category, encrypted_description, encrypted_amount, type_, user_id))
-
-    connect_to_database.commit()
-    connect_to_database.close()
-    return db_cursor.lastrowid, True
-
-def viewAllTransactions(user_id):
-    global encryption_key
-    if encryption_key is None:
-        raise ValueError("Encryption key is not set. Please log in.")
-    fernet = Fernet(encryption_key)
-    connect_to_database = sqlite3.connect(DB_PATH)
-    db_cursor = connect_to_database.cursor()
-    db_cursor.execute('SELECT id, date, category, description, amount, type FROM transactions WHERE user_id = ?', (user_id,))
-    rows = db_cursor.fetchall()
-    connect_to_database.close()
+# SQLite builds before 3.32 cap a statement at 999 bound variables.
+MAX_QUERY_VARIABLES = 900
+
+def encryptTransaction(cipher, date, category, description, amount, type_, user_id):
+    payload = cipher.encryptRow(user_id, date, category, description, amount)
+    row_fingerprint = cipher.fingerprint(user_id, date, description, amount)
+    row_month_token = cipher.monthToken(user_id, monthKey(date))
+    return (type_, user_id, row_fingerprint, row_month_token, payload)
+
+def decryptTransactions(cipher, rows, user_id):
     decrypted_rows = []
     for row in rows:
         try:
-            decrypted_date = fernet.decrypt(row[1].encode()).decode()
-            decrypted_category = fernet.decrypt(row[2].encode()).decode()
-            decrypted_description = fernet.decrypt(row[3].encode()).decode()
-            decrypted_amount = float(fernet.decrypt(row[4].encode()).decode())
-            decrypted_rows.append((row[0], decrypted_date, decrypted_category, decrypted_description, decrypted_amount, row[5]))
+            decrypted_date, decrypted_category, decrypted_description, decrypted_amount = cipher.decryptRow(user_id, row[1], row[2], row[3], row[4], row[6])
+            decrypted_rows.append((row[0], decrypted_date, decrypted_category, decrypted_description, float(decrypted_amount), row[5]))
         except Exception:
             continue
     return decrypted_rows
 
-def viewTransactionsByMonth(month, year, user_id):
-    global encryption_key
-    if encryption_key is None:
-        raise ValueError("Encryption key is not set. Please log in.")
-    fernet = Fernet(encryption_key)
-    connect_to_database = sqlite3.connect(DB_PATH)
-    db_cursor = connect_to_database.cursor()
-    db_cursor.execute('SELECT id, date, category, description, amount, type FROM transactions WHERE user_id = ?', (user_id,))
-    rows = db_cursor.fetchall()
-    connect_to_database.close()
-    decrypted_rows = []
-    for row in rows:
+def decryptTransactionsParallel(cipher, rows, user_id):
+    return decryption.map(lambda chunk: decryptTransactions(cipher, chunk, user_id), rows)
+
+@traced("db")
+def insertTransaction(date, category, description, amount, type_, session):
+    user_id = session.userId
+
+    # Row ciphertexts are randomized, so duplicates are detected through the deterministic fingerprint:
+    # the UNIQUE index turns the check into a single index probe as part of the insert itself.
+    with connections.transaction() as db_cursor:
+        # A password change swaps the session's cipher while it holds the write lock (see database/rekey.py),
+        # so writers only look the cipher up once they hold it.
+        cipher = session.requireCipher()
+        params = encryptTransaction(cipher, date, category, description, amount, type_, user_id)
+        db_cursor.execute(INSERT_TRANSACTION_QUERY, params)
+
+        if db_cursor.rowcount == 0:
+            return None, False
+        transaction_id = db_cursor.lastrowid
+
+        deltas = {}
+        addRollupDelta(deltas, cipher, user_id, date, category, amount, type_)
+        applyRollupDeltas(db_cursor, cipher, user_id, deltas)
+
+    transactionsInserted(session, [(transaction_id, date, category, description, amount, type_)])
+    return transaction_id, True
+
+def encryptTransactions(cipher, rows, user_id):
+    # Returns the per-row results filled in so far (errors and duplicates within the batch) and the rows left to insert.
+    results = [None] * len(rows)
+    pending = []
+    batch_fingerprints = set()
+    for index, row in enumerate(rows):
         try:
-            decrypted_date = fernet.decrypt(row[1].encode()).decode()
-            date_obj = datetime.datetime.strptime(decrypted_date, "%d-%m-%Y")
-            if date_obj.month == month and date_obj.year == year:
-                decrypted_category = fernet.decrypt(row[2].encode()).decode()
-                decrypted_description = fernet.decrypt(row[3].encode()).decode()
-                decrypted_amount = float(fernet.decrypt(row[4].encode()).decode())
-                decrypted_rows.append((row[0], decrypted_date, decrypted_category, decrypted_description, decrypted_amount, row[5]))
-        except Exception:
+            params = encryptTransaction(cipher, row['date'], row['category'], row['description'], row['amount'], row['type'], user_id)
+        except Exception as e:
+            results[index] = (TRANSACTION_ERROR, str(e))
             continue
-    return decrypted_rows
 
-def clearAllTransactions(user_id):
-    connect_to_database = sqlite3.connect(DB_PATH)
-    db_cursor = connect_to_database.cursor()
-    db_cursor.execute('DELETE FROM transactions WHERE user_id = ?', (user_id,))
-    connect_to_database.commit()
-    connect_to_database.execute('VACUUM')
-    connect_to_database.close()
+        if params[2] in batch_fingerprints:
+            results[index] = (TRANSACTION_DUPLICATE, None)
+            continue
+        batch_fingerprints.add(params[2])
+        pending.append((index, params))
+    return results, pending
 
-def deleteTransactionsByID(user_id, ids):
-    if not ids:
+@traced("db")
+def insertTransactions(rows, session):
+    cipher = session.requireCipher()
+    user_id = session.userId
+    results, pending = encryptTransactions(cipher, rows, user_id)
+
+    with connections.transaction() as db_cursor:
+        # The batch is encrypted before taking the write lock. If a password change swapped the cipher while this
+        # waited for the lock (see database/rekey.py), the batch is encrypted again under the new key.
+        if session.requireCipher() is not cipher:
+            cipher = session.requireCipher()
+            results, pending = encryptTransactions(cipher, rows, user_id)
+
+        existing = set()
+        fingerprints = [params[2] for _, params in pending]
+        for start in range(0, len(fingerprints), MAX_QUERY_VARIABLES):
+            chunk = fingerprints[start:start + MAX_QUERY_VARIABLES]
+            db_cursor.execute(f"SELECT fingerprint FROM transactions WHERE fingerprint IN ({','.join('?' for _ in chunk)})", chunk)
+            existing.update(result[0] for result in db_cursor)
+
+        new_rows = []
+        new_indexes = []
+        for index, params in pending:
+            if params[2] in existing:
+                results[index] = (TRANSACTION_DUPLICATE, None)
+            else:
+                results[index] = (TRANSACTION_CREATED, None)
+                new_rows.append(params)
+                new_indexes.append(index)
+
+        db_cursor.executemany(INSERT_TRANSACTION_QUERY, new_rows)
+
+        deltas = {}
+        for index in new_indexes:
+            row = rows[index]
+            addRollupDelta(deltas, cipher, user_id, row['date'], row['category'], row['amount'], row['type'])
+        applyRollupDeltas(db_cursor, cipher, user_id, deltas)
+
+        # executemany does not report row ids, so the cache and the listeners get them through the fingerprint index.
+        ids_by_fingerprint = {}
+        if new_rows and (session.cache is not None or session.events.hasListeners()):
+            new_fingerprints = [params[2] for params in new_rows]
+            for start in range(0, len(new_fingerprints), MAX_QUERY_VARIABLES):
+                chunk = new_fingerprints[start:start + MAX_QUERY_VARIABLES]
+                db_cursor.execute(f"SELECT fingerprint, id FROM transactions WHERE fingerprint IN ({','.join('?' for _ in chunk)})", chunk)
+                ids_by_fingerprint.update(db_cursor.fetchall())
+
+    if ids_by_fingerprint:
+        cached_rows = []
+        for index, params in zip(new_indexes, new_rows):
+            row = rows[index]
+            cached_rows.append((ids_by_fingerprint[params[2]], row['date'], row['category'], row['description'], row['amount'], row['type']))
+        cached_rows.sort(key=lambda cached_row: cached_row[0])
+        transactionsInserted(session, cached_rows)
+
+    return results
+
+class MonthlyRollup(NamedTuple):
+    month: str
+    category: str
+    type: str
+    total: float
+    absTotal: float
+    count: int
+
+ROLLUP_UPSERT_QUERY = '''
+    INSERT INTO monthly_rollups (user_id, month_token, category_token, type, payload)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, month_token, category_token, type) DO UPDATE SET payload = excluded.payload
+'''
+
+def addRollupDelta(deltas, cipher, user_id, date, category, amount, type_, sign=1):
+    # Rows whose date or amount does not parse are left out, like they are on the read path.
+    month = monthKey(date)
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError):
+        return
+    if month is None:
+        return
+
+    bucket = (cipher.monthToken(user_id, month), cipher.categoryToken(user_id, category), str(type_))
+    delta = deltas.setdefault(bucket, [month, category, 0.0, 0.0, 0])
+    delta[2] += sign * amount
+    delta[3] += sign * abs(amount)
+    delta[4] += sign
+
+def applyRollupDeltas(db_cursor, cipher, user_id, deltas):
+    # Runs inside the caller's transaction, so the rollups always describe exactly the committed rows.
+    for bucket, (month, category, total, abs_total, count) in deltas.items():
+        result = db_cursor.execute("SELECT payload FROM monthly_rollups WHERE user_id = ? AND month_token = ? AND category_token = ? AND type = ?", (user_id, *bucket)).fetchone()
+        if result:
+            _, _, stored_total, stored_abs_total, stored_count = cipher.decryptRollup(user_id, bucket, result[0])
+            total += stored_total
+            abs_total += stored_abs_total
+            count += stored_count
+
+        if count <= 0:
+            db_cursor.execute("DELETE FROM monthly_rollups WHERE user_id = ? AND month_token = ? AND category_token = ? AND type = ?", (user_id, *bucket))
+        else:
+            payload = cipher.encryptRollup(user_id, bucket, [month, category, total, abs_total, count])
+            db_cursor.execute(ROLLUP_UPSERT_QUERY, (user_id, *bucket, payload))
+
+def rebuildMonthlyRollups(session, rows):
+    cipher = session.requireCipher()
+    user_id = session.userId
+    deltas = {}
+    for _, date, category, _, amount, type_ in rows:
+        addRollupDelta(deltas, cipher, user_id, date, category, amount, type_)
+
+    with connections.transaction() as db_cursor:
+        db_cursor.execute("DELETE FROM monthly_rollups WHERE user_id = ?", (user_id,))
+        applyRollupDeltas(db_cursor, cipher, user_id, deltas)
+
+def ensureMonthlyRollups(session):
+    # Accounts created before the rollup table existed get theirs built once, from the freshly loaded cache.
+    if connections.execute("SELECT 1 FROM monthly_rollups WHERE user_id = ? LIMIT 1", (session.userId,)).fetchone():
+        return
+    if connections.execute("SELECT 1 FROM transactions WHERE user_id = ? LIMIT 1", (session.userId,)).fetchone():
+        rebuildMonthlyRollups(session, viewAllTransactions(session))
+
+@traced("db")
+def viewMonthlyRollups(session, type_=None):
+    # Per month and category totals: O(months x categories) rows instead of the whole history.
+    cipher = session.requireCipher()
+    user_id = session.userId
+    query = "SELECT month_token, category_token, type, payload FROM monthly_rollups WHERE user_id = ?"
+    params = [user_id]
+    if type_ is not None:
+        query += " AND type = ?"
+        params.append(type_)
+
+    rollups = []
+    for month_token, category_token, rollup_type, payload in connections.execute(query, params):
+        month, category, total, abs_total, count = cipher.decryptRollup(user_id, (month_token, category_token, rollup_type), payload)
+        rollups.append(MonthlyRollup(month, category, rollup_type, total, abs_total, count))
+    rollups.sort()
+    return rollups
+
+def backfillBlindIndexes(session):
+    cipher = session.requireCipher()
+    user_id = session.userId
+    rows = connections.execute(f'''
+        {SELECT_TRANSACTIONS_QUERY}
+        WHERE user_id = ? AND (month_token IS NULL OR (fingerprint IS NULL AND NOT duplicate))
+    ''', (user_id,)).fetchall()
+    if not rows:
+        return 0
+
+    updates = []
+    for row in decryptTransactionsParallel(cipher, rows, user_id):
+        updates.append((cipher.fingerprint(user_id, row[1], row[3], row[4]), cipher.monthToken(user_id, monthKey(row[1])), row[0]))
+
+    # Rows that duplicate an already fingerprinted row keep a NULL fingerprint instead of failing the backfill,
+    # and are flagged so the next login does not select them again. Every update only touches columns still
+    # missing, so a login with nothing left to backfill writes nothing and leaves the change counter alone.
+    with connections.transaction() as db_cursor:
+        db_cursor.executemany('UPDATE transactions SET month_token = ? WHERE id = ? AND month_token IS NULL', [(update[1], update[2]) for update in updates])
+        db_cursor.executemany('UPDATE OR IGNORE transactions SET fingerprint = ? WHERE id = ? AND fingerprint IS NULL', [(update[0], update[2]) for update in updates])
+        db_cursor.executemany('UPDATE transactions SET duplicate = 1 WHERE id = ? AND fingerprint IS NULL AND NOT duplicate', [(update[2],) for update in updates])
+    return len(updates)
+
+@traced("db")
+def migrateRowFormat(session, batch_size=ROW_MIGRATION_BATCH_SIZE, stop=None):
+    cipher = session.requireCipher()
+    user_id = session.userId
+    converted = 0
+    last_id = 0
+    while stop is None or not stop.is_set():
+        rows = connections.execute(f'''
+            {SELECT_TRANSACTIONS_QUERY}
+            WHERE user_id = ? AND payload IS NULL AND id > ?
+            ORDER BY id LIMIT ?
+        ''', (user_id, last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        updates = []
+        for row in rows:
+            try:
+                date, category, description, amount = cipher.decryptRow(user_id, row[1], row[2], row[3], row[4], None)
+            except Exception:
+                continue
+            updates.append((cipher.encryptRow(user_id, date, category, description, amount), row[0]))
+
+        with connections.transaction() as db_cursor:
+            db_cursor.executemany('''
+                UPDATE transactions SET payload = ?, date = NULL, category = NULL, description = NULL, amount = NULL
+                WHERE id = ? AND payload IS NULL
+            ''', updates)
+        converted += len(updates)
+
+        if stop is not None:
+            stop.wait(ROW_MIGRATION_PAUSE_SECONDS)
+    return converted
+
+def startRowFormatMigration(session):
+    pending = connections.execute('SELECT 1 FROM transactions WHERE user_id = ? AND payload IS NULL LIMIT 1', (session.userId,)).fetchone()
+    if not pending:
+        return None
+
+    def run():
+        try:
+            migrateRowFormat(session, stop=session.stop)
+        except ValueError:
+            # The session was closed while a batch was being prepared.
+            pass
+        finally:
+            connections.closeThreadConnection()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+def transactionsInserted(session, rows):
+    # Brings the cache up to date with rows that were just committed and tells the session's listeners.
+    cached_rows = []
+    for transaction_id, date, category, description, amount, type_ in rows:
+        try:
+            cached_rows.append((transaction_id, date, category, description, float(amount), type_))
+        except ValueError:
+            # Matches the read path, which skips rows whose amount does not parse.
+            continue
+    if session.cache is not None:
+        session.cache.append(cached_rows)
+    session.events.publish(TransactionsInserted, cached_rows)
+
+def fetchAllTransactions(session):
+    cipher = session.requireCipher()
+    rows = connections.execute(f'{SELECT_TRANSACTIONS_QUERY} WHERE user_id = ? ORDER BY id', (session.userId,)).fetchall()
+    return decryptTransactionsParallel(cipher, rows, session.userId)
+
+@traced("db")
+def loadTransactionCache(session):
+    cache = TransactionCache(session.userId)
+    cache.load(fetchAllTransactions(session))
+    session.cache = cache
+    return cache
+
+@traced("db")
+def viewAllTransactions(session):
+    cache = session.cache
+    if cache is not None:
+        return cache.rows()
+    return fetchAllTransactions(session)
+
+@traced("db")
+def searchTransactionIds(query, session):
+    # Ids of the transactions where the query occurs in any field, ignoring case.
+    cache = session.cache
+    if cache is not None:
+        return set(cache.searchIds(query).tolist())
+    query = query.lower()
+    return {row[0] for row in fetchAllTransactions(session) if any(query in str(cell).lower() for cell in row)}
+
+def viewTransactionsByMonthTokens(tokens, session):
+    cipher = session.requireCipher()
+    rows = connections.execute(
+        f'{SELECT_TRANSACTIONS_QUERY} WHERE user_id = ? AND month_token IN ({",".join("?" for _ in tokens)}) ORDER BY id',
+        [session.userId] + list(tokens)
+    ).fetchall()
+    return decryptTransactionsParallel(cipher, rows, session.userId)
+
+class TransactionRecord(NamedTuple):
+    id: int
+    date: str
+    category: str
+    description: str
+    amount: float
+    type: str
+
+ITER_PAGE_SIZE = 5000
+# Ranges spanning more months than this are scanned rather than expanded into month tokens.
+MAX_RANGE_MONTH_TOKENS = 240
+
+def monthKeysBetween(startDate, endDate):
+    month_keys = []
+    year, month = startDate.year, startDate.month
+    while (year, month) <= (endDate.year, endDate.month):
+        month_keys.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return month_keys
+
+def iterTransactions(session, startDate=None, endDate=None, type_=None, pageSize=ITER_PAGE_SIZE):
+    # Yields TransactionRecords one page at a time, so memory stays bounded by the page size rather than
+    # the size of the history. startDate and endDate are inclusive datetime.date bounds.
+    cipher = session.requireCipher()
+    user_id = session.userId
+    start_ordinal = startDate.toordinal() if startDate else None
+    end_ordinal = endDate.toordinal() if endDate else None
+
+    def inRange(record):
+        if start_ordinal is None and end_ordinal is None:
+            return True
+        ordinal = parseOrdinal(record[1])
+        if ordinal == 0:
+            return False
+        return (start_ordinal is None or ordinal >= start_ordinal) and (end_ordinal is None or ordinal <= end_ordinal)
+
+    cache = session.cache
+    if cache is not None:
+        for row in cache.iterRows(start_ordinal, end_ordinal + 1 if end_ordinal is not None else None, type_, pageSize):
+            yield TransactionRecord(*row)
         return
 
-    connect_to_database = sqlite3.connect(DB_PATH)
-    db_cursor = connect_to_database.cursor()
-    query = f"DELETE FROM transactions WHERE user_id = ? AND id IN ({','.join('?' for _ in ids)})"
-    params = [user_id] + list(ids)
-    db_cursor.execute(query, params)
-    connect_to_database.commit()
-    connect_to_database.close()
-
-def backupDB():
-    connect_to_database = sqlite3.connect(DB_PATH)
-    DB_BACKUP_PATH.parent.mkdir(exist_ok=True)
-    db_backup_conn = sqlite3.connect(DB_BACKUP_PATH)
-    connect_to_database.backup(db_backup_conn)
-    connect_to_database.close()
-    db_backup_conn.close()
\ No newline at end of file
+    query = f'{SELECT_TRANSACTIONS_QUERY} WHERE user_id = ?'
+    params = [user_id]
+    if type_ is not None:
+        query += ' AND type = ?'
+        params.append(type_)
+    if startDate and endDate:
+        month_keys = monthKeysBetween(startDate, endDate)
+        if len(month_keys) <= MAX_RANGE_MONTH_TOKENS:
+            query += f' AND month_token IN ({",".join("?" for _ in month_keys)})'
+            params.extend(cipher.monthToken(user_id, month_key) for month_key in month_keys)
+    query += ' ORDER BY id'
+
+    db_cursor = connections.connection().cursor()
+    try:
+        db_cursor.execute(query, params)
+        while True:
+            rows = db_cursor.fetchmany(pageSize)
+            if not rows:
+                break
+            for row in decryptTransactionsParallel(cipher, rows, user_id):
+                if inRange(row):
+                    yield TransactionRecord(*row)
+    finally:
+        db_cursor.close()
+
+@traced("db")
+def viewTransactionsByMonth(month, year, session):
+    cipher = session.requireCipher()
+    cache = session.cache
+    if cache is not None:
+        next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+        return cache.rowsBetween(datetime.date(year, month, 1).toordinal(), next_month.toordinal())
+    return viewTransactionsByMonthTokens([cipher.monthToken(session.userId, f"{year:04d}-{month:02d}")], session)
+
+@traced("db")
+def viewTransactionsByYear(year, session):
+    cipher = session.requireCipher()
+    cache = session.cache
+    if cache is not None:
+        return cache.rowsBetween(datetime.date(year, 1, 1).toordinal(), datetime.date(year + 1, 1, 1).toordinal())
+    return viewTransactionsByMonthTokens([cipher.monthToken(session.userId, f"{year:04d}-{month:02d}") for month in range(1, 13)], session)
+
+@traced("db")
+def viewTransactionColumns(session, year=None, type_=None):
+    # Typed columns of the transactions (see TransactionCache.columns), optionally limited to one year and type.
+    cache = session.cache
+    if cache is None:
+        cache = TransactionCache(session.userId)
+        cache.load(viewTransactionsByYear(year, session) if year is not None else viewAllTransactions(session))
+    if year is None:
+        return cache.columns(typeName=type_)
+    return cache.columns(datetime.date(year, 1, 1).toordinal(), datetime.date(year + 1, 1, 1).toordinal(), type_)
+
+@traced("db")
+def clearAllTransactions(session):
+    with connections.transaction() as db_cursor:
+        db_cursor.execute('DELETE FROM transactions WHERE user_id = ?', (session.userId,))
+        db_cursor.execute('DELETE FROM monthly_rollups WHERE user_id = ?', (session.userId,))
+        db_cursor.execute('DELETE FROM rekey_rows WHERE user_id = ?', (session.userId,))
+    cache = session.cache
+    if cache is not None:
+        cache.clear()
+    session.events.publish(TransactionsCleared)
+    vacuum.schedule()
+
+DELETE_PAGE_SIZE = 5000
+
+@traced("db")
+def deleteTransactionsByID(session, ids):
+    # Ids are staged in a temporary table instead of one IN (?, ?, ...) clause, so a selection of any size stays
+    # within SQLite's bound variable limit and the delete is planned as a single join. The rows being deleted
+    # are decrypted page by page to take them out of the monthly rollups in the same transaction.
+    # Returns the number of rows removed.
+    ids = list(ids)
+    if not ids:
+        return 0
+
+    user_id = session.userId
+    with connections.transaction() as db_cursor:
+        # Looked up under the write lock, like in insertTransaction, so the rollups are updated under the current key.
+        cipher = session.requireCipher()
+        db_cursor.execute("CREATE TEMP TABLE IF NOT EXISTS delete_ids (id INTEGER PRIMARY KEY)")
+        db_cursor.execute("DELETE FROM temp.delete_ids")
+        db_cursor.executemany("INSERT OR IGNORE INTO temp.delete_ids (id) VALUES (?)", ((transaction_id,) for transaction_id in ids))
+
+        deltas = {}
+        removed_rows = []
+        deleted_rows = connections.connection().cursor()
+        deleted_rows.execute(f"{SELECT_TRANSACTIONS_QUERY} WHERE user_id = ? AND id IN (SELECT id FROM temp.delete_ids)", (user_id,))
+        while True:
+            rows = deleted_rows.fetchmany(DELETE_PAGE_SIZE)
+            if not rows:
+                break
+            for row in decryptTransactionsParallel(cipher, rows, user_id):
+                _, date, category, _, amount, type_ = row
+                addRollupDelta(deltas, cipher, user_id, date, category, amount, type_, sign=-1)
+                removed_rows.append(row)
+        deleted_rows.close()
+
+        removed = db_cursor.execute("DELETE FROM transactions WHERE user_id = ? AND id IN (SELECT id FROM temp.delete_ids)", (user_id,)).rowcount
+        db_cursor.execute("DELETE FROM rekey_rows WHERE user_id = ? AND id IN (SELECT id FROM temp.delete_ids)", (user_id,))
+        applyRollupDeltas(db_cursor, cipher, user_id, deltas)
+        db_cursor.execute("DELETE FROM temp.delete_ids")
+
+    cache = session.cache
+    if cache is not None:
+        cache.remove(ids)
+    if removed:
+        session.events.publish(TransactionsDeleted, removed_rows)
+    return removed
+
+@traced("db")
+def backupDB(progress=None, force=False):
+    return backups.run(progress, force)
+
+def startBackup(progress=None, onComplete=None, force=False):
+    return backups.start(progress, onComplete, force)
+
+@traced("db")
+def compactDB(progress=None):
+    return vacuum.compact(progress, pauseSeconds=0)
+
+def startCompaction(progress=None, onComplete=None):
+    return vacuum.start(progress, onComplete, pauseSeconds=0)
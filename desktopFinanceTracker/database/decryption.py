@@ -0,0 +1,43 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_SIZE = 2000
+# Below this many rows the hand-off to the pool costs more than it saves.
+PARALLEL_THRESHOLD = 4000
+
+def defaultWorkerCount():
+    return max(1, min(8, os.cpu_count() or 1))
+
+class DecryptionEngine:
+    # Splits fetched rows into chunks and decrypts them on a thread pool. The AES and HMAC work in the
+    # cryptography primitives runs outside the GIL, so chunks make progress on several cores at once.
+    # executor.map returns chunks in submission order, which keeps the output order deterministic.
+    def __init__(self, workers=None, chunkSize=CHUNK_SIZE, parallelThreshold=PARALLEL_THRESHOLD):
+        self.workers = workers or defaultWorkerCount()
+        self.chunkSize = chunkSize
+        self.parallelThreshold = parallelThreshold
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="decrypt")
+            return self._executor
+
+    def map(self, decryptChunk, rows):
+        if self.workers <= 1 or len(rows) < self.parallelThreshold:
+            return decryptChunk(rows)
+
+        chunks = [rows[start:start + self.chunkSize] for start in range(0, len(rows), self.chunkSize)]
+        decrypted_rows = []
+        for chunk in self.executor().map(decryptChunk, chunks):
+            decrypted_rows.extend(chunk)
+        return decrypted_rows
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,45 @@
+import threading
+from typing import NamedTuple
+
+class TransactionsInserted(NamedTuple):
+    version: int
+    rows: list
+
+class TransactionsDeleted(NamedTuple):
+    version: int
+    rows: list
+
+class TransactionsCleared(NamedTuple):
+    version: int
+
+class EventBus:
+    # Tells listeners about changes to a session's transactions once they are committed. Each event carries the
+    # decrypted rows as (id, date, category, description, amount, type), so a listener can patch what it shows
+    # without reading anything back. Listeners run on the thread that made the change, which is a worker thread
+    # for imports; UI listeners have to hand the event over to the Tk thread themselves.
+    # version counts the changes and can be used to tell whether anything derived from the data is stale.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.version = 0
+
+    def subscribe(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def hasListeners(self):
+        return bool(self._listeners)
+
+    def publish(self, eventType, *fields):
+        with self._lock:
+            self.version += 1
+            event = eventType(self.version, *fields)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(event)
+        return event
@@ -0,0 +1,75 @@
+import threading
+import time
+
+AUTO_VACUUM_INCREMENTAL = 2
+PAGES_PER_TICK = 128
+TICK_PAUSE_SECONDS = 0.05
+
+class IncrementalVacuum:
+    # With auto_vacuum=INCREMENTAL deleted rows only put pages on the freelist. They are given back to the
+    # filesystem here a bounded number of pages per tick, each tick its own short write transaction, so
+    # other threads are never locked out for as long as a full VACUUM would.
+    def __init__(self, connections, pagesPerTick=PAGES_PER_TICK, pauseSeconds=TICK_PAUSE_SECONDS):
+        self.connections = connections
+        self.pagesPerTick = pagesPerTick
+        self.pauseSeconds = pauseSeconds
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def freePages(self):
+        return self.connections.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def tick(self):
+        # executescript steps the pragma to completion; a plain execute only frees a single page.
+        self.connections.connection().executescript(f"PRAGMA incremental_vacuum({self.pagesPerTick})")
+
+    def compact(self, progress=None, pauseSeconds=None):
+        # progress(freed, total) is called after every tick. Returns the number of pages freed.
+        pauseSeconds = self.pauseSeconds if pauseSeconds is None else pauseSeconds
+        with self._lock:
+            if self.connections.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+                return 0
+
+            remaining = self.freePages()
+            total = remaining
+            freed = 0
+            while remaining:
+                self.tick()
+                now = self.freePages()
+                if now >= remaining:
+                    break
+                freed += remaining - now
+                total = max(total, freed + now)
+                remaining = now
+                if progress:
+                    progress(freed, total)
+                if remaining and pauseSeconds:
+                    time.sleep(pauseSeconds)
+
+            # In WAL mode the file is only truncated once the freed pages are checkpointed.
+            self.connections.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return freed
+
+    def start(self, progress=None, onComplete=None, pauseSeconds=None):
+        # onComplete(freed, error) runs on the worker thread.
+        def run():
+            freed, error = 0, None
+            try:
+                freed = self.compact(progress, pauseSeconds)
+            except Exception as e:
+                error = e
+            finally:
+                self.connections.closeThreadConnection()
+            if onComplete:
+                onComplete(freed, error)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def schedule(self):
+        # Called after purges. A run already in progress keeps going until the freelist is empty.
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        self._thread = self.start()
+        return self._thread
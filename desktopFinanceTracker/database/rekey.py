@@ -0,0 +1,144 @@
+import os
+import time
+from typing import NamedTuple
+import bcrypt
+from app.config import KDF_ITERATIONS
+from database.crypto import RowCipher, monthKey
+from database import db
+
+REKEY_BATCH_SIZE = 2000
+# The last column keeps rows that were left without a fingerprint (duplicates) without one, so the UNIQUE index holds.
+REKEY_SELECT_QUERY = 'SELECT id, date, category, description, amount, type, payload, fingerprint IS NULL FROM transactions'
+
+class RekeyResult(NamedTuple):
+    rows: int
+    skipped: int
+    seconds: float
+    rowsPerSecond: float
+    resumed: bool
+
+def rekeyChunk(old_cipher, new_cipher, user_id, rows):
+    # Runs on the decryption pool: decrypt with the old key, re-encrypt and recompute the blind indexes with the new one.
+    rekeyed = []
+    for row in rows:
+        try:
+            date, category, description, amount = old_cipher.decryptRow(user_id, row[1], row[2], row[3], row[4], row[6])
+        except Exception:
+            continue
+        rekeyed.append((
+            row[0],
+            user_id,
+            None if row[7] else new_cipher.fingerprint(user_id, date, description, amount),
+            new_cipher.monthToken(user_id, monthKey(date)),
+            new_cipher.encryptRow(user_id, date, category, description, amount)
+        ))
+    return rekeyed
+
+def stageRows(db_cursor, old_cipher, new_cipher, user_id, rows):
+    rekeyed = db.decryption.map(lambda chunk: rekeyChunk(old_cipher, new_cipher, user_id, chunk), rows)
+    db_cursor.executemany("INSERT OR REPLACE INTO rekey_rows (id, user_id, fingerprint, month_token, payload) VALUES (?, ?, ?, ?, ?)", rekeyed)
+
+def loadCheckpoint(user_id, new_password):
+    # A checkpoint is only resumed if it was started for the same new password; otherwise it is thrown away.
+    # Returns (password_hash, salt, iterations, last_id) and whether an earlier run is being resumed.
+    state = db.connections.execute("SELECT password_hash, salt, kdf_iterations, last_id FROM rekey_state WHERE user_id = ?", (user_id,)).fetchone()
+    if state and bcrypt.checkpw(new_password.encode(), state[0]):
+        return state, True
+
+    state = (db.hashPassword(new_password), os.urandom(16), KDF_ITERATIONS, 0)
+    with db.connections.transaction() as db_cursor:
+        db_cursor.execute("DELETE FROM rekey_rows WHERE user_id = ?", (user_id,))
+        db_cursor.execute("INSERT OR REPLACE INTO rekey_state (user_id, password_hash, salt, kdf_iterations, last_id) VALUES (?, ?, ?, ?, ?)", (user_id, *state))
+    return state, False
+
+def rekeyRollups(db_cursor, old_cipher, new_cipher, user_id):
+    # Rollups are re-encrypted from themselves: O(months x categories), no need to revisit the rows.
+    rollups = db_cursor.execute("SELECT month_token, category_token, type, payload FROM monthly_rollups WHERE user_id = ?", (user_id,)).fetchall()
+    db_cursor.execute("DELETE FROM monthly_rollups WHERE user_id = ?", (user_id,))
+    for month_token, category_token, type_, payload in rollups:
+        month, category, total, abs_total, count = old_cipher.decryptRollup(user_id, (month_token, category_token, type_), payload)
+        bucket = (new_cipher.monthToken(user_id, month), new_cipher.categoryToken(user_id, category), type_)
+        db_cursor.execute(db.ROLLUP_UPSERT_QUERY, (user_id, *bucket, new_cipher.encryptRollup(user_id, bucket, [month, category, total, abs_total, count])))
+
+def changePassword(session, old_password, new_password, batch_size=REKEY_BATCH_SIZE, progress=None):
+    # Re-encrypts every row of the user under a key derived from the new password.
+    # Rows are read with keyset pagination and staged in rekey_rows one committed batch at a time, with the
+    # position checkpointed in rekey_state, so memory stays bounded by the batch size and an interrupted run
+    # resumes where it stopped. The live rows, rollups and credentials are only swapped in the final
+    # transaction; until then the old password keeps working. progress(done, total, rowsPerSecond) is
+    # called after every batch.
+    start = time.perf_counter()
+    user_id = session.userId
+    result = db.connections.execute("SELECT password_hash, salt, kdf_iterations FROM users WHERE id = ?", (user_id,)).fetchone()
+    if not result:
+        raise ValueError("User not found!")
+    old_key = db.checkCredentials(old_password, result[0], result[1], result[2] or db.LEGACY_KDF_ITERATIONS)
+    if old_key is None:
+        raise ValueError("Incorrect password!")
+
+    (password_hash, salt, iterations, last_id), resumed = loadCheckpoint(user_id, new_password)
+    new_key, _ = db.deriveKey(new_password, salt, iterations)
+    old_cipher = RowCipher(old_key)
+    new_cipher = RowCipher(new_key)
+
+    total = db.connections.execute("SELECT COUNT(*) FROM transactions WHERE user_id = ?", (user_id,)).fetchone()[0]
+    done = db.connections.execute("SELECT COUNT(*) FROM transactions WHERE user_id = ? AND id <= ?", (user_id, last_id)).fetchone()[0]
+    processed = 0
+    while True:
+        # The batch is read in the transaction that stages it, so every staged row matches the live row when it
+        # commits. Deleting or clearing transactions drops their staged copies, so a later row that reuses a
+        # deleted id is never swapped for the deleted row's data.
+        with db.connections.transaction() as db_cursor:
+            rows = db_cursor.execute(f'''
+                {REKEY_SELECT_QUERY}
+                WHERE user_id = ? AND id > ?
+                ORDER BY id LIMIT ?
+            ''', (user_id, last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            stageRows(db_cursor, old_cipher, new_cipher, user_id, rows)
+            db_cursor.execute("UPDATE rekey_state SET last_id = ? WHERE user_id = ?", (last_id, user_id))
+        processed += len(rows)
+        done += len(rows)
+
+        if progress:
+            elapsed = time.perf_counter() - start
+            progress(done, total, processed / elapsed if elapsed else 0.0)
+
+    # Writers look the session's cipher up once they hold the write lock, so it is switched inside the swap and
+    # set back before the lock is released if the swap fails. No row can be written under the old key afterwards.
+    previous_cipher = session.cipher
+    def restoreCipher():
+        session.cipher = previous_cipher
+
+    with db.connections.transaction(onRollback=restoreCipher) as db_cursor:
+        # Rows added while the batches ran are picked up here, with writers locked out.
+        late_rows = db_cursor.execute(f'''
+            {REKEY_SELECT_QUERY} AS t
+            WHERE user_id = ? AND NOT EXISTS (SELECT 1 FROM rekey_rows AS r WHERE r.id = t.id)
+        ''', (user_id,)).fetchall()
+        stageRows(db_cursor, old_cipher, new_cipher, user_id, late_rows)
+        processed += len(late_rows)
+
+        rekeyed = db_cursor.execute('''
+            UPDATE transactions
+            SET fingerprint = r.fingerprint, month_token = r.month_token, payload = r.payload,
+                date = NULL, category = NULL, description = NULL, amount = NULL
+            FROM rekey_rows AS r
+            WHERE transactions.id = r.id AND transactions.user_id = ?
+        ''', (user_id,)).rowcount
+        # Rows that could not be decrypted with the old key were unreadable before and are left untouched.
+        skipped = db_cursor.execute("SELECT COUNT(*) FROM transactions WHERE user_id = ?", (user_id,)).fetchone()[0] - rekeyed
+        rekeyRollups(db_cursor, old_cipher, new_cipher, user_id)
+        db_cursor.execute("UPDATE users SET password_hash = ?, salt = ?, kdf_iterations = ? WHERE id = ?", (password_hash, salt, iterations, user_id))
+        db_cursor.execute("DELETE FROM rekey_rows WHERE user_id = ?", (user_id,))
+        db_cursor.execute("DELETE FROM rekey_state WHERE user_id = ?", (user_id,))
+        # A session closed in the meantime stays closed.
+        if session.cipher is not None:
+            session.cipher = new_cipher
+
+    db.vacuum.schedule()
+
+    seconds = time.perf_counter() - start
+    return RekeyResult(rekeyed, skipped, seconds, processed / seconds if seconds else 0.0, resumed)
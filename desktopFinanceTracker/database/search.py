@@ -0,0 +1,93 @@
+import numpy as np
+
+MAX_GRAM = 3
+MAX_SEGMENTS = 8
+ID_BITS = 37
+
+def gramCode(gram: bytes) -> int:
+    code = len(gram)
+    for byte in gram:
+        code = (code << 8) | byte
+    return code
+
+class NgramIndex:
+    # Postings of every 1-, 2- and 3-gram in a set of short ASCII texts (ids and amounts), each held as a sorted
+    # array of gram codes with the transaction ids beside it, so a lookup is two binary searches. Rows added later
+    # go into a new segment; segments are merged once there are too many. Removing rows drops their postings, since
+    # SQLite can hand a deleted row's id to the next insert and short queries are answered from the postings alone.
+    def __init__(self):
+        self.segments = []
+
+    def _keys(self, ids, texts):
+        # Every (gram, id) pair of the texts, packed as gram code << ID_BITS | id.
+        encoded = [text.encode("ascii", "replace") for text in texts]
+        lengths = np.fromiter((len(text) for text in encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b"\0".join(encoded) + b"\0", dtype=np.uint8).astype(np.int64)
+        owners = np.repeat(np.asarray(ids, dtype=np.int64), lengths + 1)
+
+        keys = []
+        for size in range(1, MAX_GRAM + 1):
+            if len(data) < size:
+                break
+            count = len(data) - size + 1
+            codes = np.full(count, size, dtype=np.int64)
+            valid = np.ones(count, dtype=bool)
+            for offset in range(size):
+                window = data[offset:offset + count]
+                codes = (codes << 8) | window
+                valid &= window != 0
+            keys.append((codes[valid] << ID_BITS) | owners[:count][valid])
+        return np.concatenate(keys)
+
+    def add(self, ids, texts):
+        if not len(ids):
+            return
+        self.segments.append(self._segment(self._keys(ids, texts)))
+        if len(self.segments) > MAX_SEGMENTS:
+            self.segments = [self._segment(np.concatenate([(codes << ID_BITS) | owners for codes, owners in self.segments]))]
+
+    def remove(self, ids, texts):
+        # texts are the ones the rows were added with, so exactly their postings are dropped.
+        if not len(ids):
+            return
+        removed = self._keys(ids, texts)
+        segments = []
+        for codes, owners in self.segments:
+            keep = ~np.isin((codes << ID_BITS) | owners, removed)
+            if keep.any():
+                segments.append((codes[keep], owners[keep]))
+        self.segments = segments
+
+    def _segment(self, keys):
+        keys = np.sort(keys)
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        return keys >> ID_BITS, keys & ((1 << ID_BITS) - 1)
+
+    def postings(self, gram: bytes):
+        code = gramCode(gram)
+        found = []
+        for codes, owners in self.segments:
+            low, high = np.searchsorted(codes, [code, code + 1])
+            found.append(owners[low:high])
+        if len(found) == 1:
+            # A single segment is sorted by gram and then id, so its slice is already sorted and unique.
+            return found[0]
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def candidates(self, query: str):
+        # Exact for queries of up to three characters; longer queries return ids that contain all of the query's
+        # trigrams, which the caller still has to check.
+        try:
+            encoded = query.encode("ascii")
+        except UnicodeEncodeError:
+            return np.empty(0, dtype=np.int64)
+        if len(encoded) <= MAX_GRAM:
+            return self.postings(encoded)
+
+        result = None
+        for start in range(len(encoded) - MAX_GRAM + 1):
+            found = self.postings(encoded[start:start + MAX_GRAM])
+            result = found if result is None else np.intersect1d(result, found, assume_unique=True)
+            if not len(result):
+                break
+        return result
@@ -0,0 +1,27 @@
+import threading
+from database.events import EventBus
+
+class Session:
+    # Everything the calls made on behalf of a logged-in user need, built once by verifyLogin: the user id,
+    # the row cipher with its derived subkeys, the decrypted transaction cache and the change events. It is passed explicitly
+    # instead of living in module globals, so several sessions can be open side by side (e.g. in benchmarks).
+    def __init__(self, user_id, username, cipher, cache=None):
+        self.userId = user_id
+        self.username = username
+        self.cipher = cipher
+        self.cache = cache
+        self.events = EventBus()
+        # Set on close so background work started for this session (row migration) stops.
+        self.stop = threading.Event()
+
+    def requireCipher(self):
+        if self.cipher is None:
+            raise ValueError("Encryption key is not set. Please log in.")
+        return self.cipher
+
+    def close(self):
+        self.stop.set()
+        self.cipher = None
+        if self.cache is not None:
+            self.cache.clear()
+        self.cache = None
@@ -0,0 +1,60 @@
+import os
+import sys
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+# Key derivation is slow by design; the tests only need it to be correct.
+os.environ.setdefault("FINANCE_TRACKER_KDF_ITERATIONS", "1000")
+
+from database import db
+from database.crypto import monthKey
+
+USERNAME = "user"
+PASSWORD = "password"
+
+@pytest.fixture
+def database(tmp_path):
+    db.connections.usePath(tmp_path / "finance.db")
+    db.initDB()
+    yield
+    db.connections.closeAll()
+
+@pytest.fixture
+def session(database):
+    db.insertUser(USERNAME, PASSWORD)
+    session = db.verifyLogin(USERNAME, PASSWORD)
+    yield session
+    session.close()
+
+def transactions(count, start=0, month=1):
+    return [{
+        "date": f"{index % 28 + 1:02d}-{month:02d}-2024",
+        "category": f"Category {index % 3}",
+        "description": f"Description {index}",
+        "amount": float(index + 1),
+        "type": "income" if index % 4 == 0 else "expense",
+    } for index in range(start, start + count)]
+
+def storedRows(session):
+    # Read and decrypted from the database itself, bypassing the session's cache.
+    return db.fetchAllTransactions(session)
+
+def expectedRollups(rows):
+    totals = {}
+    for _, date, category, _, amount, type_ in rows:
+        total = totals.setdefault((monthKey(date), category, type_), [0.0, 0.0, 0])
+        total[0] += amount
+        total[1] += abs(amount)
+        total[2] += 1
+    return {key: (round(total, 6), round(abs_total, 6), count) for key, (total, abs_total, count) in totals.items()}
+
+def storedRollups(session):
+    return {(rollup.month, rollup.category, rollup.type): (round(rollup.total, 6), round(rollup.absTotal, 6), rollup.count) for rollup in db.viewMonthlyRollups(session)}
+
+def assertConsistent(session):
+    # The rollups and the cache both agree with the rows stored in the database.
+    rows = storedRows(session)
+    assert storedRollups(session) == expectedRollups(rows)
+    assert session.cache.rows() == rows
+    return rows
@@ -0,0 +1,25 @@
+from database import db
+from database.backup import BackupEngine
+from conftest import transactions, storedRows
+
+def test_change_counter_moves_once_per_write_transaction(session):
+    counter = db.backups.changeCounter()
+    db.insertTransactions(transactions(30), session)
+    assert db.backups.changeCounter() == counter + 1
+
+    # A batch of duplicates changes nothing, so it does not count.
+    db.insertTransactions(transactions(30), session)
+    assert db.backups.changeCounter() == counter + 1
+
+    db.deleteTransactionsByID(session, [row[0] for row in storedRows(session)])
+    assert db.backups.changeCounter() == counter + 2
+
+def test_backup_is_skipped_until_something_changes(session, tmp_path):
+    backups = BackupEngine(db.connections, tmp_path / "backups")
+    db.insertTransactions(transactions(10), session)
+
+    assert backups.run() is not None
+    assert backups.run() is None
+    db.insertTransactions(transactions(1, start=50), session)
+    assert backups.run() is not None
+    assert len(backups.snapshots()) == 2
@@ -0,0 +1,11 @@
+from database import db
+from conftest import transactions, storedRows, assertConsistent
+
+def test_delete_keeps_rollups_and_cache_consistent(session):
+    db.insertTransactions(transactions(40), session)
+    ids = [row[0] for row in storedRows(session)]
+
+    assert db.deleteTransactionsByID(session, ids[::3] + [max(ids) + 100]) == len(ids[::3])
+    rows = assertConsistent(session)
+    assert [row[0] for row in rows] == [id_ for id_ in ids if id_ not in ids[::3]]
+
@@ -0,0 +1,29 @@
+from database import db
+from conftest import USERNAME, PASSWORD, transactions, storedRows
+
+def test_duplicates_are_not_inserted(session):
+    db.insertTransactions(transactions(10), session)
+    results = db.insertTransactions(transactions(12), session)
+
+    assert [status for status, _ in results] == [db.TRANSACTION_DUPLICATE] * 10 + [db.TRANSACTION_CREATED] * 2
+    assert db.insertTransaction("01-01-2024", "Category 0", "Description 0", 1.0, "income", session) == (None, False)
+    assert len(storedRows(session)) == 12
+
+def test_backfill_of_legacy_duplicates_runs_once(session):
+    db.insertTransactions(transactions(2), session)
+    # Rows written before the blind indexes existed, one of them a copy of an already fingerprinted row.
+    with db.connections.transaction() as db_cursor:
+        db_cursor.execute("INSERT INTO transactions (type, user_id, payload) SELECT type, user_id, payload FROM transactions ORDER BY id LIMIT 1")
+        db_cursor.execute("UPDATE transactions SET month_token = NULL")
+    session.close()
+
+    db.verifyLogin(USERNAME, PASSWORD).close()
+    assert db.connections.execute("SELECT COUNT(*) FROM transactions WHERE month_token IS NULL").fetchone()[0] == 0
+    assert db.connections.execute("SELECT COUNT(*) FROM transactions WHERE fingerprint IS NULL AND duplicate").fetchone()[0] == 1
+
+    counter = db.backups.changeCounter()
+    for _ in range(3):
+        login = db.verifyLogin(USERNAME, PASSWORD)
+        assert len(storedRows(login)) == 3
+        login.close()
+    assert db.backups.changeCounter() == counter
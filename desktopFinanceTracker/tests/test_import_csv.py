@@ -0,0 +1,26 @@
+from app.utils import import_csv as csv_import
+from conftest import storedRows
+
+HEADER = "Date,Category,Description,Amount,Type\n"
+
+def test_failed_batch_reports_the_rows_already_imported(session, tmp_path, monkeypatch):
+    batches = []
+    insert = csv_import.insertTransactions
+    def insertTransactions(rows, session):
+        batches.append(len(rows))
+        if len(batches) == 2:
+            raise ValueError("cannot save")
+        return insert(rows, session)
+
+    monkeypatch.setattr(csv_import, "IMPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(csv_import, "insertTransactions", insertTransactions)
+    path = tmp_path / "import.csv"
+    path.write_text(HEADER + "".join(f"2024-01-0{day},Food,Row {day},{day}.0,expense\n" for day in range(1, 7)), encoding="utf-8")
+
+    imported_count, errors = csv_import.import_csv(session, str(path))
+
+    # The failed save is reported as such, not as a bad date, and stops the import.
+    assert batches == [2, 2]
+    assert imported_count == 2
+    assert errors == ["Error processing CSV: cannot save"]
+    assert len(storedRows(session)) == 2
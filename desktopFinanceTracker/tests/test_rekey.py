@@ -0,0 +1,146 @@
+import threading
+import time
+import pytest
+from database import db, rekey
+from conftest import USERNAME, PASSWORD, transactions, storedRows, expectedRollups, storedRollups
+
+NEW_PASSWORD = "new password"
+
+class Interrupted(Exception):
+    pass
+
+def interruptAfter(batches):
+    calls = []
+    def progress(done, total, rowsPerSecond):
+        calls.append(done)
+        if len(calls) >= batches:
+            raise Interrupted()
+    return progress
+
+def content(rows):
+    return sorted(row[1:] for row in rows)
+
+def loginWithNewPassword():
+    assert db.verifyLogin(USERNAME, PASSWORD) is None
+    session = db.verifyLogin(USERNAME, NEW_PASSWORD)
+    assert session is not None
+    return session
+
+def assertRekeyed(expected):
+    session = loginWithNewPassword()
+    rows = storedRows(session)
+    assert content(rows) == content(expected)
+    assert storedRollups(session) == expectedRollups(rows)
+    assert db.connections.execute("SELECT COUNT(*) FROM rekey_rows").fetchone()[0] == 0
+    session.close()
+    return rows
+
+def test_rekey(session):
+    db.insertTransactions(transactions(25), session)
+    expected = storedRows(session)
+
+    result = rekey.changePassword(session, PASSWORD, NEW_PASSWORD, batch_size=10)
+
+    assert (result.rows, result.skipped, result.resumed) == (25, 0, False)
+    assert storedRows(session) == expected
+    assertRekeyed(expected)
+
+def test_resume_after_deleting_a_staged_row_whose_id_is_reused(session):
+    db.insertTransactions(transactions(30), session)
+    with pytest.raises(Interrupted):
+        rekey.changePassword(session, PASSWORD, NEW_PASSWORD, batch_size=100, progress=interruptAfter(1))
+
+    # SQLite hands the highest id out again once its row is gone.
+    last_id = max(row[0] for row in storedRows(session))
+    db.deleteTransactionsByID(session, [last_id])
+    assert db.insertTransaction("02-02-2024", "NEW", "New row", 999.0, "expense", session) == (last_id, True)
+    expected = storedRows(session)
+
+    result = rekey.changePassword(session, PASSWORD, NEW_PASSWORD)
+
+    assert result.resumed
+    rows = assertRekeyed(expected)
+    assert (last_id, "02-02-2024", "NEW", "New row", 999.0, "expense") in rows
+
+def test_resume_with_deletes_and_inserts_between_runs(session):
+    db.insertTransactions(transactions(50), session)
+    with pytest.raises(Interrupted):
+        rekey.changePassword(session, PASSWORD, NEW_PASSWORD, batch_size=10, progress=interruptAfter(2))
+
+    ids = [row[0] for row in storedRows(session)]
+    # Staged and not yet staged rows alike.
+    db.deleteTransactionsByID(session, ids[5:15] + ids[-5:])
+    db.insertTransactions(transactions(8, start=200, month=5), session)
+    expected = storedRows(session)
+
+    result = rekey.changePassword(session, PASSWORD, NEW_PASSWORD, batch_size=10)
+
+    assert result.resumed
+    assert result.rows == len(expected)
+    assertRekeyed(expected)
+
+def test_resume_after_clearing_all_transactions(session):
+    db.insertTransactions(transactions(20), session)
+    with pytest.raises(Interrupted):
+        rekey.changePassword(session, PASSWORD, NEW_PASSWORD, batch_size=100, progress=interruptAfter(1))
+
+    db.clearAllTransactions(session)
+    db.insertTransactions(transactions(3, start=500), session)
+    expected = storedRows(session)
+
+    assert rekey.changePassword(session, PASSWORD, NEW_PASSWORD).resumed
+    assertRekeyed(expected)
+
+def test_failed_swap_keeps_the_old_key(session, monkeypatch):
+    db.insertTransactions(transactions(10), session)
+    expected = storedRows(session)
+    cipher = session.cipher
+
+    def fail(*args):
+        raise RuntimeError("swap failed")
+    monkeypatch.setattr(rekey, "rekeyRollups", fail)
+    with pytest.raises(RuntimeError):
+        rekey.changePassword(session, PASSWORD, NEW_PASSWORD)
+
+    assert session.cipher is cipher
+    assert storedRows(session) == expected
+    assert db.verifyLogin(USERNAME, NEW_PASSWORD) is None
+
+    monkeypatch.undo()
+    assert rekey.changePassword(session, PASSWORD, NEW_PASSWORD).resumed
+    assertRekeyed(expected)
+
+@pytest.mark.parametrize("insert", [
+    lambda session: db.insertTransaction("03-03-2024", "Late", "Added during the swap", 42.0, "expense", session),
+    lambda session: db.insertTransactions(transactions(5, start=300, month=3), session),
+])
+def test_writes_waiting_on_the_swap_use_the_new_key(session, monkeypatch, insert):
+    db.insertTransactions(transactions(10), session)
+    rekeyRollups = rekey.rekeyRollups
+    writer = None
+
+    def run():
+        try:
+            insert(session)
+        finally:
+            db.connections.closeThreadConnection()
+
+    def rekeyRollupsWithWriter(*args):
+        # The writer is started while the swap holds the write lock, so it waits on BEGIN IMMEDIATE until the
+        # swap has committed.
+        nonlocal writer
+        writer = threading.Thread(target=run)
+        writer.start()
+        time.sleep(0.2)
+        assert writer.is_alive()
+        rekeyRollups(*args)
+
+    monkeypatch.setattr(rekey, "rekeyRollups", rekeyRollupsWithWriter)
+    rekey.changePassword(session, PASSWORD, NEW_PASSWORD)
+    writer.join()
+
+    new_session = loginWithNewPassword()
+    rows = storedRows(new_session)
+    assert len(rows) == db.connections.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] > 10
+    assert storedRollups(new_session) == expectedRollups(rows)
+    new_session.close()
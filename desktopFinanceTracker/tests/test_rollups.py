@@ -0,0 +1,22 @@
+from database import db
+from conftest import transactions, storedRows, storedRollups, assertConsistent
+
+def test_insert_keeps_rollups_and_cache_consistent(session):
+    db.insertTransactions(transactions(50), session)
+    transaction_id, created = db.insertTransaction("15-02-2024", "Category 9", "Single", 12.5, "expense", session)
+
+    assert created
+    rows = assertConsistent(session)
+    assert len(rows) == 51
+    assert rows[-1] == (transaction_id, "15-02-2024", "Category 9", "Single", 12.5, "expense")
+
+def test_clear_empties_rollups_and_cache(session):
+    db.insertTransactions(transactions(20), session)
+    db.clearAllTransactions(session)
+
+    assert storedRows(session) == []
+    assert storedRollups(session) == {}
+    assert len(session.cache) == 0
+
+    db.insertTransactions(transactions(5, start=100, month=3), session)
+    assert len(assertConsistent(session)) == 5
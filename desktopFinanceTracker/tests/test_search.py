@@ -0,0 +1,19 @@
+from database import db
+from conftest import transactions
+
+def test_search_after_reused_id(session):
+    db.insertTransactions(transactions(3), session)
+    ids = [row[0] for row in db.fetchAllTransactions(session)]
+    last = max(ids)
+    row = transactions(1, start=554)[0]
+    db.insertTransactions([row], session)
+    reused = max(row[0] for row in db.fetchAllTransactions(session))
+
+    # Builds the search index before the delete, so the deleted row's postings have to be dropped.
+    assert db.searchTransactionIds("555", session) == {reused}
+    db.deleteTransactionsByID(session, [reused])
+    db.insertTransactions([{**row, "description": "Other", "amount": 12.0}], session)
+    assert max(row[0] for row in db.fetchAllTransactions(session)) == reused > last
+
+    assert db.searchTransactionIds("555", session) == set()
+    assert db.searchTransactionIds("12", session) == {reused}